@@ -0,0 +1,66 @@
+# Compare response encoding paths for a page of customers:
+#   pydantic - model_validate + jsonable_encoder + stdlib json (the old path)
+#   stdlib   - json_response with FAST_JSON=false
+#   orjson   - json_response with FAST_JSON=true
+#
+# Run from the repository root: python -m benchmarks.bench_json --rows 100
+import argparse
+import timeit
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+import responses
+from models.Customer import Customer, CustomerRead
+
+
+def make_customers(rows: int):
+    return [
+        Customer(
+            customer_id=n,
+            first_name=f"First{n}",
+            last_name=f"Last{n}",
+            email=f"customer{n}@example.com",
+            phone="555-0100",
+            address=f"{n} Benchmark Avenue, Suite {n % 100}",
+            city="Springfield",
+            country="USA",
+        )
+        for n in range(1, rows + 1)
+    ]
+
+
+def pydantic_path(customers):
+    data = [CustomerRead.model_validate(customer) for customer in customers]
+    return JSONResponse(jsonable_encoder({"data": data})).body
+
+
+def fast_path(customers, enabled: bool):
+    responses.enable_fast_json(enabled)
+    return responses.json_response({"data": customers}).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response encoding paths")
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    customers = make_customers(args.rows)
+    paths = {
+        "pydantic": lambda: pydantic_path(customers),
+        "stdlib": lambda: fast_path(customers, False),
+        "orjson": lambda: fast_path(customers, True),
+    }
+
+    baseline = None
+    for name, run in paths.items():
+        run()  # warm up caches
+        seconds = min(timeit.repeat(run, number=args.repeat, repeat=5)) / args.repeat
+        baseline = baseline or seconds
+        print(
+            f"{name:>9}: {seconds * 1e6:9.1f} us/response "
+            f"({baseline / seconds:4.1f}x, {args.rows} rows)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Compare two benchmarks.load reports route by route: latency percentiles
+# and throughput of the new run relative to the baseline.
+#
+# Run from the repository root:
+#   python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+import argparse
+import json
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def change(old, new):
+    if not old or new is None:
+        return "      n/a"
+    return f"{(new - old) / old * 100:+8.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline  {baseline['revision']} ({baseline['timestamp']})")
+    print(f"candidate {candidate['revision']} ({candidate['timestamp']})")
+    print(f"{'route':<26}" + "".join(f"{metric:>10}" for metric in METRICS))
+
+    old_routes = dict(baseline["routes"], overall=baseline["overall"])
+    new_routes = dict(candidate["routes"], overall=candidate["overall"])
+    for name, new in new_routes.items():
+        old = old_routes.get(name, {})
+        print(
+            f"{name:<26}"
+            + "".join(f" {change(old.get(m), new.get(m))}" for m in METRICS)
+        )
+
+    old_rss, new_rss = baseline["peak_rss_bytes"], candidate["peak_rss_bytes"]
+    print(f"{'peak RSS':<26} {change(old_rss, new_rss)}")
+
+
+if __name__ == "__main__":
+    main()
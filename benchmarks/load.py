@@ -0,0 +1,617 @@
+# Drive every customer, employee and category route at a fixed concurrency
+# and report p50/p95/p99 latency, requests per second and peak RSS, saved as
+# JSON so runs of different builds can be compared (benchmarks.compare).
+#
+#   asgi    - the app in this process, through httpx's ASGI transport
+#   uvicorn - a real uvicorn server in a subprocess, over HTTP
+#
+# The database is first topped up to the requested sizes (benchmarks.seed).
+# Rows the run creates are the only ones it updates or deletes, and whatever
+# is left of them is removed afterwards.
+#
+# Run from the repository root:
+#   python -m benchmarks.load --transport uvicorn --concurrency 32 --duration 30
+#   python -m benchmarks.load --customers 1000000 --weights customers.export=0
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import resource
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional
+import httpx
+from benchmarks.seed import add_size_arguments, seed, sizes_from
+
+API = "/api/v1"
+
+# Read ids sampled per table for the by-id routes
+SAMPLED_IDS = 500
+
+
+@dataclass
+class Call:
+    name: str
+    method: str
+    url: str
+    params: Optional[dict] = None
+    json: object = None
+    done: Optional[Callable] = None  # called with the response on success
+
+
+# Ids to read, plus the rows this run created, which are the only ones it
+# updates or deletes. An id is taken out while a request is using it.
+class Workload:
+    def __init__(self, ids: dict, rng: random.Random):
+        self.ids = ids
+        self.rng = rng
+        self.own = defaultdict(list)
+
+    def read_id(self, table: str):
+        return self.rng.choice(self.ids[table] or [0])
+
+    def take(self, table: str):
+        own = self.own[table]
+        if not own:
+            return None
+        return own.pop(self.rng.randrange(len(own)))
+
+    def give(self, table: str, key):
+        self.own[table].append(key)
+
+    def customer(self):
+        return {
+            "first_name": "Load",
+            "last_name": self.rng.choice(("Adams", "Brown", "Clark")),
+            "email": f"load.{uuid.uuid4().hex}@example.com",
+            "phone": "555-0199",
+            "address": "1 Load St.",
+            "city": self.rng.choice(("Springfield", "Leeds", "Osaka")),
+            "country": "USA",
+        }
+
+    def employee(self):
+        return {
+            "first_name": "Load",
+            "last_name": "Runner",
+            "position": self.rng.choice(("Clerk", "Manager", None)),
+            "hire_date": "2021-06-01",
+            "salary": round(self.rng.uniform(2500, 15000), 2),
+        }
+
+    def category(self):
+        return {"category_name": f"Load {uuid.uuid4().hex}", "description": "load"}
+
+
+def customers_create(work):
+    return Call(
+        "customers.create",
+        "POST",
+        f"{API}/customers/",
+        json=work.customer(),
+        done=lambda r: work.give("customers", r.json()["customer_id"]),
+    )
+
+
+def employees_create(work):
+    return Call(
+        "employees.create",
+        "POST",
+        f"{API}/employees/",
+        json=work.employee(),
+        done=lambda r: work.give("employees", r.json()["data"]["employee_id"]),
+    )
+
+
+def categories_create(work):
+    return Call(
+        "categories.create",
+        "POST",
+        f"{API}/categories/",
+        json=work.category(),
+        done=lambda r: work.give("categories", r.json()["category_id"]),
+    )
+
+
+def bulk(name, table, key, make):
+    def build(work):
+        def done(response):
+            for result in response.json()["results"]:
+                if result["status"] == "created":
+                    work.give(table, result[key])
+
+        return Call(
+            name,
+            "POST",
+            f"{API}/{table}/bulk",
+            json=[make(work) for _ in range(10)],
+            done=done,
+        )
+
+    return build
+
+
+def update(name, table, url, create, make):
+    def build(work):
+        key = work.take(table)
+        if key is None:
+            return create(work)
+        payload = make(work)
+        if table == "categories":
+            payload["category_id"] = key
+        return Call(
+            name,
+            "PUT",
+            url.format(key),
+            json=payload,
+            done=lambda r: work.give(table, key),
+        )
+
+    return build
+
+
+def delete(name, table, url, create):
+    def build(work):
+        key = work.take(table)
+        if key is None:
+            return create(work)
+        return Call(name, "DELETE", url.format(key))
+
+    return build
+
+
+def get(name, url, params=None, table=None):
+    def build(work):
+        path = url.format(work.read_id(table)) if table else url
+        return Call(name, "GET", path, params=params(work) if params else None)
+
+    return build
+
+
+# name -> (default weight, request builder)
+SCENARIOS = {
+    "customers.list": (10, get("customers.list", f"{API}/customers/")),
+    "customers.list_filtered": (
+        5,
+        get(
+            "customers.list_filtered",
+            f"{API}/customers/",
+            lambda work: {
+                "city": work.rng.choice(("Leeds", "Osaka")),
+                "order_by": "last_name",
+            },
+        ),
+    ),
+    "customers.search": (
+        5,
+        get(
+            "customers.search",
+            f"{API}/customers/search",
+            lambda work: {"q": work.rng.choice(("ada", "brown", "osaka", "main"))},
+        ),
+    ),
+    "customers.get": (
+        20,
+        get("customers.get", f"{API}/customers/{{}}/", table="customers"),
+    ),
+    "customers.export": (1, get("customers.export", f"{API}/customers/export")),
+    "customers.create": (2, customers_create),
+    "customers.bulk": (
+        1,
+        bulk("customers.bulk", "customers", "customer_id", Workload.customer),
+    ),
+    "customers.update": (
+        2,
+        update(
+            "customers.update",
+            "customers",
+            f"{API}/customers/{{}}/",
+            customers_create,
+            Workload.customer,
+        ),
+    ),
+    "customers.delete": (
+        1,
+        delete(
+            "customers.delete", "customers", f"{API}/customers/{{}}/", customers_create
+        ),
+    ),
+    "employees.list": (10, get("employees.list", f"{API}/employees/")),
+    "employees.list_filtered": (
+        5,
+        get(
+            "employees.list_filtered",
+            f"{API}/employees/",
+            lambda work: {"position": "Manager", "order_by": "-salary", "limit": 20},
+        ),
+    ),
+    "employees.get": (
+        20,
+        get("employees.get", f"{API}/employees/{{}}", table="employees"),
+    ),
+    "employees.export": (1, get("employees.export", f"{API}/employees/export")),
+    "employees.create": (2, employees_create),
+    "employees.bulk": (
+        1,
+        bulk("employees.bulk", "employees", "employee_id", Workload.employee),
+    ),
+    "employees.update": (
+        2,
+        update(
+            "employees.update",
+            "employees",
+            f"{API}/employees/{{}}",
+            employees_create,
+            Workload.employee,
+        ),
+    ),
+    "employees.delete": (
+        1,
+        delete(
+            "employees.delete", "employees", f"{API}/employees/{{}}", employees_create
+        ),
+    ),
+    "categories.list": (10, get("categories.list", f"{API}/categories/")),
+    "categories.list_paged": (
+        5,
+        get(
+            "categories.list_paged",
+            f"{API}/categories/",
+            lambda work: {"limit": 50, "order_by": "category_name"},
+        ),
+    ),
+    "categories.get": (
+        20,
+        get("categories.get", f"{API}/categories/{{}}", table="categories"),
+    ),
+    "categories.export": (1, get("categories.export", f"{API}/categories/export")),
+    "categories.create": (1, categories_create),
+    "categories.bulk": (
+        1,
+        bulk("categories.bulk", "categories", "category_id", Workload.category),
+    ),
+    "categories.update": (
+        1,
+        update(
+            "categories.update",
+            "categories",
+            f"{API}/categories/{{}}",
+            categories_create,
+            Workload.category,
+        ),
+    ),
+    "categories.delete": (
+        1,
+        delete(
+            "categories.delete",
+            "categories",
+            f"{API}/categories/{{}}",
+            categories_create,
+        ),
+    ),
+}
+
+CLEANUP_URLS = {
+    "customers": f"{API}/customers/{{}}/",
+    "employees": f"{API}/employees/{{}}",
+    "categories": f"{API}/categories/{{}}",
+}
+
+
+# Ids spread over each table's key range, found with index seeks rather than
+# an ORDER BY random() scan
+def sample_ids(path: str, rng: random.Random):
+    keys = {
+        "customers": "customer_id",
+        "employees": "employee_id",
+        "categories": "category_id",
+    }
+    ids, counts = {}, {}
+    with sqlite3.connect(path) as connection:
+        for table, key in keys.items():
+            (counts[table],) = connection.execute(
+                f"SELECT COUNT(*) FROM {table}"
+            ).fetchone()
+            low, high = connection.execute(
+                f"SELECT MIN({key}), MAX({key}) FROM {table}"
+            ).fetchone()
+            found = set()
+            if low is not None:
+                for _ in range(SAMPLED_IDS):
+                    row = connection.execute(
+                        f"SELECT {key} FROM {table} WHERE {key} >= ? "
+                        f"ORDER BY {key} LIMIT 1",
+                        (rng.randint(low, high),),
+                    ).fetchone()
+                    found.add(row[0])
+            ids[table] = sorted(found)
+    return ids, counts
+
+
+def percentile(ordered, p: float):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+def summarize(latencies, statuses, elapsed: float):
+    def stats(values, counts):
+        ordered = sorted(values)
+        return {
+            "requests": len(ordered),
+            "rps": round(len(ordered) / elapsed, 2),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 3) if ordered else None,
+            "p95_ms": round(percentile(ordered, 95) * 1000, 3) if ordered else None,
+            "p99_ms": round(percentile(ordered, 99) * 1000, 3) if ordered else None,
+            "max_ms": round(ordered[-1] * 1000, 3) if ordered else None,
+            "statuses": dict(counts),
+        }
+
+    routes = {
+        name: stats(latencies[name], statuses[name]) for name in sorted(latencies)
+    }
+    everything = [value for values in latencies.values() for value in values]
+    overall = Counter()
+    for counts in statuses.values():
+        overall.update(counts)
+    return routes, stats(everything, overall)
+
+
+async def drive(client, work, scenarios, concurrency: int, duration: float):
+    names = list(scenarios)
+    weights = [scenarios[name][0] for name in names]
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+
+    async def send(call: Call):
+        started = time.perf_counter()
+        try:
+            response = await client.request(
+                call.method, call.url, params=call.params, json=call.json
+            )
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, "error"
+        return response, status, time.perf_counter() - started
+
+    # One pass over every route warms caches and connections untimed
+    for name in names:
+        call = scenarios[name][1](work)
+        response, status, _ = await send(call)
+        if call.done and response is not None and status < 400:
+            call.done(response)
+
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            name = work.rng.choices(names, weights)[0]
+            call = scenarios[name][1](work)
+            response, status, elapsed = await send(call)
+            latencies[call.name].append(elapsed)
+            statuses[call.name][str(status)] += 1
+            if call.done and response is not None and status < 400:
+                call.done(response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+async def cleanup(client, work):
+    for table, url in CLEANUP_URLS.items():
+        while True:
+            key = work.take(table)
+            if key is None:
+                break
+            await client.delete(url.format(key))
+
+
+async def run_asgi(work, scenarios, args):
+    # Imported here, once DATABASE_URL points at the benchmark database
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            results = await drive(
+                client, work, scenarios, args.concurrency, args.duration
+            )
+            await cleanup(client, work)
+
+    # Includes the load generator itself; ru_maxrss is KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024
+    return results, peak
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Peak resident set size of another process (VmHWM), where /proc exists
+def peak_rss(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+# Start `uvicorn main:app` with the given number of worker processes on a
+# free port, and yield a client for it (pooling up to `concurrency`
+# connections) together with the server process once it answers. The
+# server is stopped on exit.
+@asynccontextmanager
+async def uvicorn_server(concurrency: int, workers: int = 1):
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=os.environ.copy(),
+    )
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=None
+        ) as client:
+            for _ in range(300):
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                try:
+                    await client.get("/metrics")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start listening")
+            yield client, server
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def run_uvicorn(work, scenarios, args):
+    async with uvicorn_server(args.concurrency) as (client, server):
+        results = await drive(client, work, scenarios, args.concurrency, args.duration)
+        await cleanup(client, work)
+        return results, peak_rss(server.pid)
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def select_scenarios(routes, weights):
+    scenarios = dict(SCENARIOS)
+    if routes:
+        prefixes = tuple(routes.split(","))
+        scenarios = {
+            name: scenario
+            for name, scenario in scenarios.items()
+            if name.startswith(prefixes)
+        }
+    for item in filter(None, (weights or "").split(",")):
+        name, weight = item.split("=")
+        if name not in scenarios:
+            raise SystemExit(f"Unknown route: {name}")
+        scenarios[name] = (float(weight), scenarios[name][1])
+    return {name: scenario for name, scenario in scenarios.items() if scenario[0] > 0}
+
+
+def print_report(report):
+    print(
+        f"{'route':<26} {'requests':>9} {'rps':>9} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9}"
+    )
+    rows = list(report["routes"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        print(
+            f"{name:<26} {stats['requests']:>9} {stats['rps']:>9.1f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+    if report["peak_rss_bytes"]:
+        print(f"peak RSS: {report['peak_rss_bytes'] / 2**20:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API routes")
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--database", default="touch.db")
+    parser.add_argument("--routes", help="comma-separated name prefixes to run")
+    parser.add_argument("--weights", help="e.g. customers.export=0,customers.get=50")
+    parser.add_argument("--output", help="JSON report path")
+    add_size_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = select_scenarios(args.routes, args.weights)
+    path = os.path.abspath(args.database)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    seed(path, sizes_from(args), args.seed)
+
+    rng = random.Random(args.seed)
+    ids, counts = sample_ids(path, rng)
+    work = Workload(ids, rng)
+    run = run_asgi if args.transport == "asgi" else run_uvicorn
+    (routes, overall), peak = asyncio.run(run(work, scenarios, args))
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "transport": args.transport,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "rows": counts,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "peak_rss_bytes": peak,
+        "routes": routes,
+        "overall": overall,
+    }
+    print_report(report)
+
+    output = args.output or os.path.join(
+        "benchmarks",
+        "results",
+        f"{report['timestamp'].replace(':', '')}-{args.transport}.json",
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {output}")
+
+
+if __name__ == "__main__":
+    main()
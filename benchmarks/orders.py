@@ -0,0 +1,258 @@
+# Place orders concurrently against a few hot products and check that none
+# oversold: for every product, the stock taken must equal the quantities of
+# the orders that succeeded, and no stock may go negative. Reports orders per
+# second, latency percentiles and response statuses (201 placed, 409 sold
+# out, 503 database busy) as JSON, like benchmarks.load.
+#
+# With --transport uvicorn --workers N, the orders come through N server
+# processes, each with its own writer connection, so they also contend for
+# SQLite's write lock across processes.
+#
+# Products and orders the run creates are removed afterwards.
+#
+# Run from the repository root:
+#   python -m benchmarks.orders --concurrency 64 --requests 5000
+#   python -m benchmarks.orders --transport uvicorn --workers 4 --hot-products 1
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+import httpx
+from benchmarks.load import git_revision, peak_rss, summarize, uvicorn_server
+from benchmarks.seed import add_size_arguments, seed, sizes_from
+
+API = "/api/v1"
+
+# Existing customers the orders are spread over
+SAMPLED_CUSTOMERS = 1000
+
+
+# Insert the hot products straight into the database; returns their ids and
+# some customers to order as
+def create_products(path: str, count: int, stock: int, rng: random.Random):
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            (category_id,) = connection.execute(
+                "SELECT MIN(category_id) FROM categories"
+            ).fetchone()
+            ids = []
+            for n in range(count):
+                cursor = connection.execute(
+                    "INSERT INTO products (product_name, category_id, price, "
+                    "stock_quantity) VALUES (?, ?, ?, ?)",
+                    (
+                        f"Order bench {n}",
+                        category_id,
+                        rng.randrange(100, 10000) / 100,
+                        stock,
+                    ),
+                )
+                ids.append(cursor.lastrowid)
+        customers = [
+            customer_id
+            for (customer_id,) in connection.execute(
+                "SELECT customer_id FROM customers ORDER BY customer_id LIMIT ?",
+                (SAMPLED_CUSTOMERS,),
+            )
+        ]
+        return ids, customers
+    finally:
+        connection.close()
+
+
+def make_order(rng: random.Random, products, customers, max_items: int):
+    chosen = rng.sample(products, rng.randint(1, min(max_items, len(products))))
+    return {
+        "customer_id": rng.choice(customers),
+        "items": [
+            {"product_id": product_id, "quantity": rng.randint(1, 3)}
+            for product_id in chosen
+        ],
+    }
+
+
+async def drive(client, orders, concurrency: int):
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    sold = Counter()
+    placed = []
+    pending = iter(orders)
+
+    async def worker():
+        for order in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"{API}/orders", json=order)
+                status = response.status_code
+            except httpx.HTTPError:
+                response, status = None, "error"
+            latencies["orders.create"].append(time.perf_counter() - started)
+            statuses["orders.create"][str(status)] += 1
+            if status == 201:
+                placed.append(response.json()["data"]["order_id"])
+                for item in order["items"]:
+                    sold[item["product_id"]] += item["quantity"]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    _, overall = summarize(latencies, statuses, time.perf_counter() - started)
+    return overall, sold, placed
+
+
+async def run_asgi(orders, args):
+    # Imported here, once DATABASE_URL points at the benchmark database
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            return await drive(client, orders, args.concurrency), None
+
+
+async def run_uvicorn(orders, args):
+    async with uvicorn_server(args.concurrency, args.workers) as (client, server):
+        return await drive(client, orders, args.concurrency), peak_rss(server.pid)
+
+
+# Compare the stock taken and the items recorded with what the placed orders
+# asked for; returns the products that do not add up
+def verify(path: str, products, stock: int, sold: Counter, placed):
+    connection = sqlite3.connect(path)
+    try:
+        marks = ", ".join("?" * len(products))
+        remaining = dict(
+            connection.execute(
+                f"SELECT product_id, stock_quantity FROM products "
+                f"WHERE product_id IN ({marks})",
+                products,
+            ).fetchall()
+        )
+        recorded = Counter()
+        for start in range(0, len(placed), 500):
+            chunk = placed[start : start + 500]
+            rows = connection.execute(
+                f"SELECT product_id, SUM(quantity) FROM orderitems "
+                f"WHERE order_id IN ({', '.join('?' * len(chunk))}) "
+                f"GROUP BY product_id",
+                chunk,
+            )
+            for product_id, quantity in rows:
+                recorded[product_id] += quantity
+    finally:
+        connection.close()
+
+    problems = {}
+    for product_id in products:
+        left = remaining[product_id]
+        taken = stock - left
+        if left < 0 or taken != sold[product_id] or recorded[product_id] != taken:
+            problems[product_id] = {
+                "remaining": left,
+                "sold": sold[product_id],
+                "recorded": recorded[product_id],
+            }
+    return problems
+
+
+def cleanup(path: str, products, placed):
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            for start in range(0, len(placed), 500):
+                chunk = placed[start : start + 500]
+                marks = ", ".join("?" * len(chunk))
+                connection.execute(
+                    f"DELETE FROM orderitems WHERE order_id IN ({marks})", chunk
+                )
+                connection.execute(
+                    f"DELETE FROM orders WHERE order_id IN ({marks})", chunk
+                )
+            marks = ", ".join("?" * len(products))
+            connection.execute(
+                f"DELETE FROM products WHERE product_id IN ({marks})", products
+            )
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent orders")
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn processes")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000, help="orders to place")
+    parser.add_argument("--hot-products", type=int, default=10)
+    parser.add_argument("--stock", type=int, default=1000, help="per hot product")
+    parser.add_argument("--max-items", type=int, default=3, help="per order")
+    parser.add_argument("--database", default="touch.db")
+    parser.add_argument("--output", help="JSON report path")
+    add_size_arguments(parser)
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.database)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    seed(path, sizes_from(args), args.seed)
+
+    rng = random.Random(args.seed)
+    products, customers = create_products(path, args.hot_products, args.stock, rng)
+    orders = [
+        make_order(rng, products, customers, args.max_items)
+        for _ in range(args.requests)
+    ]
+    run = run_asgi if args.transport == "asgi" else run_uvicorn
+    placed = []
+    try:
+        (overall, sold, placed), peak = asyncio.run(run(orders, args))
+        problems = verify(path, products, args.stock, sold, placed)
+    finally:
+        cleanup(path, products, placed)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "transport": args.transport,
+        "workers": args.workers if args.transport == "uvicorn" else None,
+        "concurrency": args.concurrency,
+        "hot_products": args.hot_products,
+        "stock": args.stock,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "peak_rss_bytes": peak,
+        "orders": overall,
+        "units_sold": sum(sold.values()),
+        "oversold": problems,
+    }
+    print(
+        f"{overall['requests']} orders in {overall['requests'] / overall['rps']:.1f}s: "
+        f"{overall['rps']:.1f}/s, p50 {overall['p50_ms']:.2f} ms, "
+        f"p95 {overall['p95_ms']:.2f} ms, p99 {overall['p99_ms']:.2f} ms"
+    )
+    print(f"statuses: {overall['statuses']}, units sold: {report['units_sold']}")
+    print("stock consistent" if not problems else f"INCONSISTENT STOCK: {problems}")
+
+    output = args.output or os.path.join(
+        "benchmarks",
+        "results",
+        f"{report['timestamp'].replace(':', '')}-orders-{args.transport}.json",
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"saved {output}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+# Generate synthetic rows for every table in Script.sql (customers, employees,
+# categories, suppliers, products, orders, order items and payments) until
+# each holds the requested number, creating the schema, counters and triggers
+# first. Output is deterministic for a given seed, and re-running with the
+# same sizes adds nothing.
+#
+# Rows are built a column at a time from precomputed value pools and written
+# with executemany in large WAL transactions. While a table is loaded its
+# triggers and secondary indexes are dropped; the indexes are then rebuilt in
+# one sorted pass and the row counts, table versions and search index the
+# triggers maintain are brought up to date. Do not run it against a database
+# the app is serving.
+#
+# Run from the repository root:
+#   python -m benchmarks.seed --database touch.db --customers 1000000
+#   python -m benchmarks.seed --database big.db --customers 2000000 \
+#       --orders 3000000 --order-items 4000000 --payments 1000000
+import argparse
+import asyncio
+import os
+import random
+import re
+import sqlite3
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+FIRST_NAMES = tuple("Ada Ben Chloe Dan Eve Finn Grace Hugo Iris Jack Kira Liam".split())
+LAST_NAMES = tuple("Adams Brown Clark Davis Evans Flores Garcia Hall Ito Jones".split())
+CITIES = (
+    ("Springfield", "USA"),
+    ("Toronto", "Canada"),
+    ("Leeds", "UK"),
+    ("Lyon", "France"),
+    ("Hanoi", "Vietnam"),
+    ("Osaka", "Japan"),
+    ("Porto", "Portugal"),
+    ("Munich", "Germany"),
+)
+POSITIONS = ("Clerk", "Sales Rep", "Manager", "Engineer", "Analyst", None)
+STREETS = ("Main St.", "Oak Ave.", "Maple Rd.", "Elm St.", "Lake Dr.")
+PRODUCT_WORDS = ("Basic", "Deluxe", "Compact", "Classic", "Smart", "Eco", "Pro")
+ORDER_STATUSES = ("Pending", "Shipped", "Delivered", "Cancelled")
+ORDER_STATUS_WEIGHTS = (2, 3, 10, 1)
+PAYMENT_METHODS = ("Credit Card", "PayPal", "Bank Transfer", "Cash")
+
+# Value pools the generators sample from, so a column costs one
+# random.choices call per batch rather than formatting every value
+PHONES = tuple(f"555-{n:04d}" for n in range(10_000))
+ADDRESSES = tuple(f"{n} {street}" for n in range(1, 1000) for street in STREETS)
+DAYS = tuple((date(2015, 1, 1) + timedelta(days=n)).isoformat() for n in range(3650))
+TIMES = tuple(f" {minute // 60:02d}:{minute % 60:02d}:00" for minute in range(1440))
+PRICES = tuple(round(1 + n * 0.25, 2) for n in range(8000))
+SALARIES = tuple(float(n) for n in range(2500, 15001, 25))
+STOCK = range(0, 500)
+QUANTITIES = range(1, 11)
+
+# Rows per executemany call, and per transaction
+BATCH_SIZE = 50_000
+TRANSACTION_ROWS = 1_000_000
+
+
+def _ids(rng: random.Random, parents: dict, table: str, count: int):
+    return rng.choices(parents[table], k=count)
+
+
+def _timestamps(rng: random.Random, count: int):
+    days = rng.choices(DAYS, k=count)
+    return [day + clock for day, clock in zip(days, rng.choices(TIMES, k=count))]
+
+
+def _full_names(rng: random.Random, count: int):
+    firsts = rng.choices(FIRST_NAMES, k=count)
+    return [f"{a} {b}" for a, b in zip(firsts, rng.choices(LAST_NAMES, k=count))]
+
+
+def customer_batch(rng: random.Random, first: int, count: int, parents: dict):
+    places = rng.choices(CITIES, k=count)
+    return zip(
+        rng.choices(FIRST_NAMES, k=count),
+        rng.choices(LAST_NAMES, k=count),
+        [f"bench.{n}@example.com" for n in range(first, first + count)],
+        rng.choices(PHONES, k=count),
+        rng.choices(ADDRESSES, k=count),
+        [city for city, _ in places],
+        [country for _, country in places],
+    )
+
+
+def employee_batch(rng: random.Random, first: int, count: int, parents: dict):
+    return zip(
+        rng.choices(FIRST_NAMES, k=count),
+        rng.choices(LAST_NAMES, k=count),
+        rng.choices(POSITIONS, k=count),
+        rng.choices(DAYS, k=count),
+        rng.choices(SALARIES, k=count),
+    )
+
+
+def category_batch(rng: random.Random, first: int, count: int, parents: dict):
+    numbers = range(first, first + count)
+    return zip(
+        [f"Bench category {n}" for n in numbers],
+        [f"Benchmark category number {n}" for n in numbers],
+    )
+
+
+def supplier_batch(rng: random.Random, first: int, count: int, parents: dict):
+    places = rng.choices(CITIES, k=count)
+    return zip(
+        [f"Bench supplier {n}" for n in range(first, first + count)],
+        _full_names(rng, count),
+        rng.choices(PHONES, k=count),
+        rng.choices(ADDRESSES, k=count),
+        [city for city, _ in places],
+        [country for _, country in places],
+    )
+
+
+def product_batch(rng: random.Random, first: int, count: int, parents: dict):
+    words = rng.choices(PRODUCT_WORDS, k=count)
+    return zip(
+        [f"{word} item {n}" for word, n in zip(words, range(first, first + count))],
+        _ids(rng, parents, "categories", count),
+        rng.choices(PRICES, k=count),
+        rng.choices(STOCK, k=count),
+        _ids(rng, parents, "suppliers", count),
+    )
+
+
+def order_batch(rng: random.Random, first: int, count: int, parents: dict):
+    return zip(
+        _ids(rng, parents, "customers", count),
+        _timestamps(rng, count),
+        rng.choices(ORDER_STATUSES, ORDER_STATUS_WEIGHTS, k=count),
+        _ids(rng, parents, "employees", count),
+        rng.choices(PRICES, k=count),
+    )
+
+
+def order_item_batch(rng: random.Random, first: int, count: int, parents: dict):
+    return zip(
+        _ids(rng, parents, "orders", count),
+        _ids(rng, parents, "products", count),
+        rng.choices(QUANTITIES, k=count),
+        rng.choices(PRICES, k=count),
+    )
+
+
+def payment_batch(rng: random.Random, first: int, count: int, parents: dict):
+    return zip(
+        _ids(rng, parents, "orders", count),
+        _timestamps(rng, count),
+        rng.choices(PRICES, k=count),
+        rng.choices(PAYMENT_METHODS, k=count),
+    )
+
+
+# table -> (primary key, insert statement, batch factory, referenced tables),
+# in an order where every referenced table comes first
+TABLES = {
+    "customers": (
+        "customer_id",
+        "INSERT OR IGNORE INTO customers (first_name, last_name, email, phone, "
+        "address, city, country) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        customer_batch,
+        (),
+    ),
+    "employees": (
+        "employee_id",
+        "INSERT INTO employees (first_name, last_name, position, hire_date, salary) "
+        "VALUES (?, ?, ?, ?, ?)",
+        employee_batch,
+        (),
+    ),
+    "categories": (
+        "category_id",
+        "INSERT OR IGNORE INTO categories (category_name, description) "
+        "VALUES (?, ?)",
+        category_batch,
+        (),
+    ),
+    "suppliers": (
+        "supplier_id",
+        "INSERT INTO suppliers (supplier_name, contact_name, phone, address, city, "
+        "country) VALUES (?, ?, ?, ?, ?, ?)",
+        supplier_batch,
+        (),
+    ),
+    "products": (
+        "product_id",
+        "INSERT INTO products (product_name, category_id, price, stock_quantity, "
+        "supplier_id) VALUES (?, ?, ?, ?, ?)",
+        product_batch,
+        ("categories", "suppliers"),
+    ),
+    "orders": (
+        "order_id",
+        "INSERT INTO orders (customer_id, order_date, status, employee_id, "
+        "total_amount) VALUES (?, ?, ?, ?, ?)",
+        order_batch,
+        ("customers", "employees"),
+    ),
+    "order_items": (
+        "order_item_id",
+        "INSERT INTO orderitems (order_id, product_id, quantity, price_per_unit) "
+        "VALUES (?, ?, ?, ?)",
+        order_item_batch,
+        ("orders", "products"),
+    ),
+    "payments": (
+        "payment_id",
+        "INSERT INTO payments (order_id, payment_date, amount, payment_method) "
+        "VALUES (?, ?, ?, ?)",
+        payment_batch,
+        ("orders",),
+    ),
+}
+
+# Size arguments whose table name differs from the option
+TABLE_NAMES = {"order_items": "orderitems"}
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Script.sql")
+
+
+# Create the schema, indexes and triggers the app itself would, plus the
+# Script.sql tables the app has no models for
+def prepare_schema(path: str):
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    from main import init_db
+    from database import engine
+
+    async def run():
+        await init_db()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+    with open(SCRIPT, encoding="utf-8") as file:
+        script = file.read()
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            for statement in re.findall(r"CREATE TABLE .*?\);", script, re.S):
+                connection.execute(
+                    statement.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1)
+                )
+    finally:
+        connection.close()
+
+
+# Drop a table's triggers and secondary indexes while it is bulk loaded, then
+# rebuild the indexes and redo what the triggers would have done for the new
+# rows. Unique constraints stay in place, so OR IGNORE still skips duplicates.
+@contextmanager
+def bulk_load(connection, table: str, key: str):
+    from invalidation import WATCHED_TABLES
+    from row_counts import COUNTED_TABLES
+    from search import SEARCH_COLUMNS
+
+    saved = connection.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE type IN ('index', 'trigger') AND tbl_name = ? COLLATE NOCASE "
+        "AND sql IS NOT NULL",
+        (table,),
+    ).fetchall()
+    (previous,) = connection.execute(
+        f"SELECT COALESCE(MAX({key}), 0) FROM {table}"
+    ).fetchone()
+    with connection:
+        for kind, name, _ in saved:
+            connection.execute(f'DROP {kind.upper()} "{name}"')
+    try:
+        yield
+    finally:
+        with connection:
+            for kind, _, sql in saved:
+                if kind == "index":
+                    connection.execute(sql)
+            if table in COUNTED_TABLES:
+                connection.execute(
+                    f"UPDATE row_counts SET row_count = (SELECT COUNT(*) FROM {table}) "
+                    f"WHERE table_name = ?",
+                    (table,),
+                )
+            if table in WATCHED_TABLES:
+                connection.execute(
+                    "UPDATE table_versions SET version = version + 1 "
+                    "WHERE table_name = ?",
+                    (table,),
+                )
+            names = [name for _, name, _ in saved]
+            if table == "customers" and "customers_fts_insert" in names:
+                columns = ", ".join(SEARCH_COLUMNS)
+                connection.execute(
+                    f"INSERT INTO customers_fts (rowid, {columns}) "
+                    f"SELECT customer_id, {columns} FROM customers "
+                    f"WHERE customer_id > ?",
+                    (previous,),
+                )
+            for kind, _, sql in saved:
+                if kind == "trigger":
+                    connection.execute(sql)
+
+
+def top_up(connection, table: str, target: int, rng: random.Random):
+    key, statement, make_batch, references = TABLES[table]
+    name = TABLE_NAMES.get(table, table)
+    (count,) = connection.execute(f"SELECT COUNT(*) FROM {name}").fetchone()
+    if count >= target:
+        return count
+    parents = {parent: referenceable(connection, parent) for parent in references}
+    with bulk_load(connection, name, key):
+        while count < target:
+            (next_n,) = connection.execute(
+                f"SELECT COALESCE(MAX({key}), 0) + 1 FROM {name}"
+            ).fetchone()
+            # Row numbers past the current maximum keep unique columns unique;
+            # OR IGNORE plus the loop covers collisions with older rows
+            missing = target - count
+            for start in range(0, missing, TRANSACTION_ROWS):
+                with connection:
+                    end = min(start + TRANSACTION_ROWS, missing)
+                    for first in range(start, end, BATCH_SIZE):
+                        size = min(BATCH_SIZE, end - first)
+                        rows = make_batch(rng, next_n + first, size, parents)
+                        connection.executemany(statement, rows)
+            (count,) = connection.execute(f"SELECT COUNT(*) FROM {name}").fetchone()
+    return count
+
+
+# Ids of the rows other tables may reference. Deleted rows leave gaps in the
+# key range, so the actual keys are read (in key order, to keep the output
+# deterministic) into a compact array rather than assumed from MIN..MAX.
+def referenceable(connection, table: str):
+    key = TABLES[table][0]
+    name = TABLE_NAMES.get(table, table)
+    rows = connection.execute(f"SELECT {key} FROM {name} ORDER BY {key}")
+    keys = array("q", (value for (value,) in rows))
+    if not keys:
+        raise ValueError(f"{table} is empty, but other tables reference it")
+    return keys
+
+
+def seed(path: str, sizes: dict, seed: int = 0):
+    prepare_schema(path)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.execute("PRAGMA cache_size = -262144")
+    connection.execute("PRAGMA temp_store = MEMORY")
+    try:
+        counts = {}
+        for table in TABLES:
+            started = time.perf_counter()
+            # One generator per table, so sizes of the others do not shift it
+            rng = random.Random(f"{seed}:{table}")
+            counts[table] = top_up(connection, table, sizes.get(table, 0), rng)
+            print(
+                f"{table:>11}: {counts[table]:>10} rows ({time.perf_counter() - started:.1f}s)"
+            )
+        connection.execute("PRAGMA optimize")
+        return counts
+    finally:
+        connection.close()
+
+
+def add_size_arguments(parser):
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=100)
+    parser.add_argument("--suppliers", type=int, default=100)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--order-items", type=int, default=5000)
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def sizes_from(args):
+    return {table: getattr(args, table) for table in TABLES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a database with synthetic rows")
+    parser.add_argument("--database", default="touch.db")
+    add_size_arguments(parser)
+    args = parser.parse_args()
+    seed(args.database, sizes_from(args), args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import json
+import logging
+from functools import cache
+from fastapi import HTTPException, Request
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import begin_immediate
+
+logger = logging.getLogger(__name__)
+
+# Rows validated and inserted per transaction
+BULK_CHUNK_SIZE = 1000
+
+
+# Yield the request rows in chunks. NDJSON bodies are read incrementally so a
+# large upload never sits in memory at once; anything else must be a JSON
+# array.
+async def read_bulk_rows(request: Request, chunk_size: int = BULK_CHUNK_SIZE):
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" not in content_type and "jsonlines" not in content_type:
+        try:
+            rows = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body.")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array.")
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start : start + chunk_size]
+        return
+
+    chunk, buffer = [], b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                chunk.append(_parse_line(line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if buffer.strip():
+        chunk.append(_parse_line(buffer))
+    if chunk:
+        yield chunk
+
+
+def _parse_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError:
+        # Kept as-is so validation reports it against its row index
+        return line.decode(errors="replace")
+
+
+# Building a TypeAdapter constructs the pydantic core schema, so there is one
+# per schema for the life of the process
+@cache
+def list_adapter(schema) -> TypeAdapter:
+    return TypeAdapter(list[schema])
+
+
+# Validate and insert every chunk, one transaction per chunk, and report a
+# result for each input row: created (with its id), invalid or conflict.
+# unique_field names a column with a uniqueness rule (e.g. customer email);
+# rows clashing with the table or an earlier row are reported as conflicts.
+async def bulk_insert(
+    db: AsyncSession, request: Request, model, schema, unique_field=None
+):
+    adapter = list_adapter(schema)
+    table = model.__table__
+    pk = table.primary_key.columns.values()[0]
+    results = []
+    index = 0
+
+    async for chunk in read_bulk_rows(request):
+        valid, errors = _validate_chunk(adapter, chunk)
+        chunk_results = [None] * len(chunk)
+        for position, row_errors in errors.items():
+            chunk_results[position] = {
+                "index": index + position,
+                "status": "invalid",
+                "errors": row_errors,
+            }
+
+        # Take the write lock before the conflict check: a deferred
+        # transaction would have to upgrade from its read to the insert,
+        # which fails with SQLITE_BUSY or lets another writer's row in
+        # between the two
+        if valid:
+            await begin_immediate(db)
+        if valid and unique_field is not None:
+            valid = await _drop_conflicts(
+                db, table, unique_field, valid, chunk_results, index
+            )
+            if not valid:
+                await db.rollback()
+
+        if valid:
+            ids = await _insert_chunk(db, table, pk, valid)
+            for (position, row), key in zip(valid, ids):
+                if key is None:
+                    chunk_results[position] = {
+                        "index": index + position,
+                        "status": "conflict",
+                        "detail": f"{unique_field} already exists",
+                    }
+                else:
+                    chunk_results[position] = {
+                        "index": index + position,
+                        "status": "created",
+                        pk.name: key,
+                    }
+
+        results.extend(chunk_results)
+        index += len(chunk)
+
+    created = sum(1 for result in results if result["status"] == "created")
+    return {
+        "message": "Bulk insert completed",
+        "created": created,
+        "failed": len(results) - created,
+        "results": results,
+    }
+
+
+# Validate a whole chunk in one TypeAdapter call; only when it fails are the
+# errors split per row and the good rows validated again.
+def _validate_chunk(adapter, chunk):
+    try:
+        return list(enumerate(adapter.validate_python(chunk))), {}
+    except ValidationError as e:
+        errors = {}
+        for error in e.errors(include_url=False, include_context=False):
+            position, *loc = error["loc"]
+            errors.setdefault(position, []).append(
+                {"loc": loc, "msg": error["msg"], "type": error["type"]}
+            )
+    positions = [i for i in range(len(chunk)) if i not in errors]
+    rows = adapter.validate_python([chunk[i] for i in positions])
+    return list(zip(positions, rows)), errors
+
+
+async def _drop_conflicts(db, table, unique_field, valid, chunk_results, offset):
+    column = table.c[unique_field]
+    values = [getattr(row, unique_field) for _, row in valid]
+    result = await db.execute(select(column).where(column.in_(values)))
+    taken = set(result.scalars().all())
+
+    kept = []
+    for position, row in valid:
+        value = getattr(row, unique_field)
+        if value in taken:
+            chunk_results[position] = {
+                "index": offset + position,
+                "status": "conflict",
+                "detail": f"{unique_field} already exists",
+            }
+        else:
+            taken.add(value)
+            kept.append((position, row))
+    return kept
+
+
+# executemany the chunk in one transaction. If a concurrent writer sneaks in
+# a conflicting row, fall back to row-by-row inserts for this chunk so one
+# clash does not fail the rest; conflicting rows come back as None.
+async def _insert_chunk(db, table, pk, valid):
+    rows = [row.model_dump() for _, row in valid]
+    statement = insert(table).returning(pk, sort_by_parameter_order=True)
+    try:
+        result = await db.execute(statement, rows)
+        ids = result.scalars().all()
+        await db.commit()
+        return ids
+    except IntegrityError as e:
+        await db.rollback()
+        logger.warning(f"Bulk chunk conflict, retrying row by row: {e}")
+
+    ids = []
+    for row in rows:
+        try:
+            result = await db.execute(insert(table).values(**row).returning(pk))
+            ids.append(result.scalar())
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            ids.append(None)
+    return ids
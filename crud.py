@@ -0,0 +1,61 @@
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from statements import delete_by_id, update_by_id, update_params
+
+
+# Shared single-statement writers. Each issues one UPDATE/DELETE ... RETURNING
+# (SQLite 3.35+) and commits, instead of SELECT + write + commit + refresh.
+# Zero affected rows maps to a 404 unless the caller wants to inspect it.
+async def update_returning(
+    db: AsyncSession,
+    model,
+    key_column,
+    key,
+    values: dict,
+    detail: str = "Not found",
+    conditions=(),
+    raise_not_found: bool = True,
+):
+    if not conditions:
+        # Plain update by primary key: reuse the prebuilt statement
+        statement = update_by_id(model, tuple(values))
+        return await _execute_returning(
+            db, statement, detail, raise_not_found, update_params(key, values)
+        )
+
+    table = model.__table__
+    statement = (
+        update(table)
+        .where(key_column == key, *conditions)
+        .values(**values)
+        .returning(*table.c)
+    )
+    return await _execute_returning(db, statement, detail, raise_not_found)
+
+
+async def delete_returning(
+    db: AsyncSession,
+    model,
+    key_column,
+    key,
+    detail: str = "Not found",
+    raise_not_found: bool = True,
+):
+    return await _execute_returning(
+        db, delete_by_id(model), detail, raise_not_found, {"id": key}
+    )
+
+
+async def _execute_returning(db, statement, detail, raise_not_found, params=None):
+    try:
+        result = await db.execute(statement, params)
+        row = result.first()
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    if row is None and raise_not_found:
+        raise HTTPException(status_code=404, detail=detail)
+    return row
@@ -1,7 +1,13 @@
 import os
+import time
 import logging
+from fastapi import HTTPException
+from sqlalchemy import event, make_url
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from query_log import query_log
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -10,21 +16,210 @@ logger = logging.getLogger(__name__)
 # Load the database URL from environment variables
 database_url = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./touch.db")
 
-# Create the database engine
-engine = create_async_engine(database_url, connect_args={"check_same_thread": False})
+# SQLite tuning profile, applied to every new connection
+sqlite_pragmas = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),  # milliseconds
+}
+
+# Prepared statements kept per connection by the sqlite3 driver, and
+# compiled statements kept by SQLAlchemy per engine
+statement_cache_size = int(os.getenv("SQLITE_STATEMENT_CACHE_SIZE", "256"))
+query_cache_size = int(os.getenv("SQLALCHEMY_QUERY_CACHE_SIZE", "1200"))
+
+# Number of read-only connections; SQLite readers scale with cores under WAL
+read_pool_size = int(os.getenv("READ_POOL_SIZE", str(os.cpu_count() or 4)))
+
+# Streaming exports allowed at once, each on its own connection
+export_concurrency = int(os.getenv("EXPORT_CONCURRENCY", "2"))
+
+
+# Build a read-only URI (mode=ro) for file databases. In-memory databases
+# cannot be shared between engines, so they keep using the writer.
+def get_read_url(url: str):
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    database = url.database
+    if not database.startswith("file:"):
+        database = f"file:{database}"
+    return url.set(database=database).update_query_dict({"mode": "ro", "uri": "true"})
+
+
+# Queue pool reporting how long each checkout waited for a connection to
+# on_wait (set by the metrics module)
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    on_wait = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.on_wait is not None:
+                self.on_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.on_wait = self.on_wait
+        return pool
+
+
+# Create the database engines: a single-connection writer, since SQLite only
+# ever admits one writer, and a pool of read-only connections for GETs
+read_url = get_read_url(database_url)
+if read_url is not None:
+    engine = create_async_engine(
+        database_url,
+        connect_args={
+            "check_same_thread": False,
+            "cached_statements": statement_cache_size,
+        },
+        query_cache_size=query_cache_size,
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    read_engine = create_async_engine(
+        read_url,
+        connect_args={
+            "check_same_thread": False,
+            "cached_statements": statement_cache_size,
+        },
+        query_cache_size=query_cache_size,
+        poolclass=TimedQueuePool,
+        pool_size=read_pool_size,
+        max_overflow=0,
+    )
+    # Exports last as long as the client takes to download, so they open
+    # read-only connections of their own instead of holding the read pool's
+    export_engine = create_async_engine(
+        read_url,
+        connect_args={"check_same_thread": False},
+        query_cache_size=query_cache_size,
+        poolclass=NullPool,
+    )
+else:
+    connect_args = {"check_same_thread": False}
+    if make_url(database_url).get_backend_name() == "sqlite":
+        connect_args["cached_statements"] = statement_cache_size
+    engine = create_async_engine(
+        database_url, connect_args=connect_args, query_cache_size=query_cache_size
+    )
+    read_engine = engine
+    export_engine = engine
+
+# Time every statement; slow ones are logged with their query plan
+query_log.track(engine)
+query_log.track(read_engine)
+if export_engine is not engine:
+    query_log.track(export_engine)
+
 SessionLocal = sessionmaker(
     autocommit=False, autoflush=False, bind=engine, class_=AsyncSession
 )
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=read_engine, class_=AsyncSession
+)
 Base = declarative_base()
 
 
-# Dependency to get the database session
-async def get_db():
+def apply_sqlite_pragmas(dbapi_connection, connection_record, read_only=False):
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas.items():
+            # The journal mode is persistent and set by the writer
+            if read_only and name == "journal_mode":
+                continue
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+for read_only_engine in {read_engine, export_engine} - {engine}:
+    event.listen(
+        read_only_engine.sync_engine,
+        "connect",
+        lambda dbapi_connection, connection_record: apply_sqlite_pragmas(
+            dbapi_connection, connection_record, read_only=True
+        ),
+    )
+
+
+# create_all skips tables that already exist, so indexes added to a model
+# later are created here instead
+def create_missing_indexes(connection):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+# Log the settings SQLite actually applied (e.g. WAL is refused for :memory:)
+async def log_sqlite_settings():
+    if engine.dialect.name != "sqlite":
+        return
+    async with engine.connect() as conn:
+        effective = {}
+        for name in sqlite_pragmas:
+            result = await conn.exec_driver_sql(f"PRAGMA {name}")
+            effective[name] = result.scalar()
+    logger.info(f"SQLite settings: {effective}")
+    return effective
+
+
+# Open the session's transaction with BEGIN IMMEDIATE, taking SQLite's write
+# lock up front. A deferred transaction that reads and then writes has to
+# upgrade its lock, which fails with SQLITE_BUSY instead of waiting when
+# another connection is writing; this one waits up to busy_timeout to start
+# and then cannot be refused. Call it before the session's first statement.
+async def begin_immediate(session: AsyncSession):
+    connection = await session.connection()
+    if connection.dialect.name == "sqlite":
+        await connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+# Dependency to get a session on the single writer connection
+async def get_write_db():
     async with SessionLocal() as session:
         try:
             yield session
-        except Exception as e:
+        except HTTPException as e:
+            # 404s, 409s and the like are expected outcomes; handlers report
+            # database failures as 500s
+            if e.status_code >= 500:
+                logger.error(f"Database session error: {e.detail}")
+            raise
+        except SQLAlchemyError as e:
             logger.error(f"Database session error: {e}")
             raise
         finally:
             await session.close()
+
+
+# Dependency to get a session on the read-only pool
+async def get_read_db():
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        except HTTPException as e:
+            # 404s, 409s and the like are expected outcomes; handlers report
+            # database failures as 500s
+            if e.status_code >= 500:
+                logger.error(f"Database session error: {e.detail}")
+            raise
+        except SQLAlchemyError as e:
+            logger.error(f"Database session error: {e}")
+            raise
+        finally:
+            await session.close()
+
+
+# Kept for existing callers; writes go through the writer
+get_db = get_write_db
@@ -0,0 +1,57 @@
+import os
+import hashlib
+from fastapi import Request, Response
+import responses
+
+# Sent with every conditional response: caches may store the body but must
+# revalidate it with the ETag before reuse
+CACHE_CONTROL = os.getenv("CACHE_CONTROL", "public, max-age=0, must-revalidate")
+
+
+def make_etag(key) -> str:
+    if isinstance(key, str):
+        key = key.encode()
+    return '"' + hashlib.blake2b(key, digest_size=12).hexdigest() + '"'
+
+
+# Strong ETag for one request against some version of its data. The path,
+# query and encoder (whose bytes may differ) are mixed in, so one data
+# version yields a distinct tag per resource and page.
+def request_etag(request: Request, version: str) -> str:
+    return make_etag(
+        f"{version}:{request.url.path}?{request.url.query}:"
+        f"{responses.fast_json_enabled}"
+    )
+
+
+def cache_headers(etag):
+    if etag is None:
+        return None
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+# A bodiless 304 when the client already holds this version, else None
+def not_modified(request: Request, etag):
+    header = request.headers.get("if-none-match")
+    if etag is None or not header:
+        return None
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=cache_headers(etag))
+    return None
+
+
+# Strong ETag from the encoded body itself: it changes exactly when this
+# representation does (a detail when its row does, a page when its rows do)
+# and costs no extra query
+def tag_response(response: Response) -> Response:
+    response.headers.update(cache_headers(make_etag(response.body)))
+    return response
+
+
+# Tag a response, or answer with a bodiless 304 when the client already
+# holds it
+def conditional_response(request: Request, response: Response) -> Response:
+    response = tag_response(response)
+    return not_modified(request, response.headers["etag"]) or response
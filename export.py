@@ -0,0 +1,80 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi.responses import StreamingResponse
+from sqlalchemy import bindparam, select
+from database import export_concurrency, export_engine
+
+# Rows fetched from SQLite per round trip while streaming
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _encode_ndjson(columns, rows):
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+        for row in rows
+    ).encode()
+
+
+def _encode_csv(columns, rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+# Exports waiting beyond this many queue for a slot
+export_slots = asyncio.Semaphore(export_concurrency)
+
+
+# Stream a whole table as NDJSON or CSV. The connection is opened inside the
+# generator (the request's dependency session is closed before the body is
+# sent), from the export engine, so a slow download never holds one of the
+# request read pool's connections. Rows are read in key order a batch at a
+# time, each batch in its own short read transaction: no snapshot is held
+# while the client drains the body, so WAL checkpoints are not held back.
+# Rows written mid-export show up if they land past the current key.
+def export_table(model, format: str, filename: str):
+    table = model.__table__
+    columns = [column.name for column in table.c]
+    key = table.primary_key.columns.values()[0]
+    key_index = columns.index(key.name)
+    encode = _encode_csv if format == "csv" else _encode_ndjson
+    first_batch = select(*table.c).order_by(key).limit(EXPORT_BATCH_SIZE)
+    next_batch = first_batch.where(key > bindparam("after", type_=key.type))
+
+    async def generate():
+        if format == "csv":
+            yield _encode_csv(columns, [columns])
+        async with export_slots, export_engine.connect() as connection:
+            rows = (await connection.execute(first_batch)).all()
+            while rows:
+                # End the read transaction before handing the batch out
+                await connection.rollback()
+                yield encode(columns, rows)
+                if len(rows) < EXPORT_BATCH_SIZE:
+                    break
+                after = rows[-1][key_index]
+                result = await connection.execute(next_batch, {"after": after})
+                rows = result.all()
+
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
@@ -0,0 +1,29 @@
+from typing import Optional
+from fastapi import HTTPException
+
+
+# Sparse fieldsets: turn ?fields=a,b into the table columns to select, so
+# narrow views read and encode only what they need. The primary key is
+# always included so rows stay addressable (and pageable).
+def select_fields(model, fields: Optional[str]):
+    table = model.__table__
+    if fields is None:
+        return list(table.c)
+
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",")))
+    names = [name for name in names if name]
+    unknown = [name for name in names if name not in table.c]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}"
+        )
+
+    for column in table.primary_key.columns:
+        if column.name not in names:
+            names.insert(0, column.name)
+    return [table.c[name] for name in names]
+
+
+# Restrict already-loaded dict rows (e.g. from a cache) to the selected columns
+def project(row: dict, columns) -> dict:
+    return {column.name: row[column.name] for column in columns}
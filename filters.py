@@ -0,0 +1,228 @@
+import inspect
+from datetime import date
+from decimal import Decimal
+from typing import Literal, Optional
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy import bindparam, func, select
+from fields import project
+from pagination import decode_keyset_cursor, fetch_keyset_page, keyset_statements
+
+# Comparisons a filter can apply; values are always bound, never inlined
+OPERATORS = {
+    "eq": lambda column, value: column == value,
+    "ge": lambda column, value: column >= value,
+    "le": lambda column, value: column <= value,
+}
+
+# Upper bound on cached statement shapes per list endpoint
+MAX_CACHED_SHAPES = 256
+
+
+# A parsed list request: paging, ordering and the whitelisted filters that
+# were actually supplied
+class FilterParams(BaseModel):
+    limit: Optional[int] = Field(100, gt=0)
+    offset: int = Field(0, ge=0)
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    order_by: str  # column name, "-" prefix for descending order
+    filters: dict = {}
+
+
+def _query_type(column):
+    python_type = column.type.python_type
+    if python_type is Decimal:
+        return float
+    if python_type in (int, float, str, date):
+        return python_type
+    return str
+
+
+# Query building for one model's list endpoint. Only whitelisted columns can
+# be filtered or sorted on, and each of those should be backed by a
+# (column, primary key) index so both the filter and the keyset ordering are
+# index seeks.
+#
+#   filters - query parameter name -> (column name, operator)
+#   sorts   - sortable column names
+#
+# The built statements are cached per request shape (selected columns,
+# filters present, ordering, cursor kind), with every value bound at
+# execution time, so repeat requests skip statement construction and reuse
+# SQLAlchemy's compiled form.
+class ListQuery:
+    def __init__(
+        self,
+        model,
+        filters: dict,
+        sorts,
+        default_sort: str = None,
+        default_limit: Optional[int] = 100,
+        max_limit: int = 1000,
+    ):
+        self.table = model.__table__
+        self.key_column = self.table.primary_key.columns.values()[0]
+        self.filters = {
+            name: (self.table.c[column], operator)
+            for name, (column, operator) in filters.items()
+        }
+        self.sorts = {name: self.table.c[name] for name in sorts}
+        self.default_sort = default_sort or self.key_column.name
+        self.default_limit = default_limit
+        self._statements = {}
+        self.params = self._build_dependency(default_limit, max_limit)
+
+    # FastAPI dependency parsing the request into FilterParams. Its signature
+    # is generated from the whitelist, so every filter is a typed, documented
+    # query parameter.
+    def _build_dependency(self, default_limit, max_limit):
+        orders = tuple(order for name in self.sorts for order in (name, f"-{name}"))
+        keyword = inspect.Parameter.KEYWORD_ONLY
+        parameters = [
+            inspect.Parameter(
+                "limit",
+                keyword,
+                default=Query(default_limit, ge=1, le=max_limit),
+                annotation=Optional[int],
+            ),
+            inspect.Parameter(
+                "offset", keyword, default=Query(0, ge=0), annotation=int
+            ),
+            inspect.Parameter(
+                "cursor", keyword, default=Query(None), annotation=Optional[str]
+            ),
+            inspect.Parameter(
+                "order_by",
+                keyword,
+                default=Query(self.default_sort),
+                annotation=Literal[orders],
+            ),
+            # Older spelling of order_by
+            inspect.Parameter(
+                "sort",
+                keyword,
+                default=Query(None, deprecated=True),
+                annotation=Optional[Literal[orders]],
+            ),
+        ]
+        for name, (column, _) in self.filters.items():
+            parameters.append(
+                inspect.Parameter(
+                    name,
+                    keyword,
+                    default=Query(None),
+                    annotation=Optional[_query_type(column)],
+                )
+            )
+
+        def dependency(**values) -> FilterParams:
+            if values["cursor"] is not None and values["offset"]:
+                raise HTTPException(
+                    status_code=400, detail="Use either cursor or offset, not both."
+                )
+            return FilterParams(
+                limit=values["limit"],
+                offset=values["offset"],
+                cursor=values["cursor"],
+                order_by=values["sort"] or values["order_by"],
+                filters={
+                    name: values[name]
+                    for name in self.filters
+                    if values[name] is not None
+                },
+            )
+
+        dependency.__signature__ = inspect.Signature(
+            parameters, return_annotation=FilterParams
+        )
+        return dependency
+
+    # Whether the request is the plain listing: no filters, default order,
+    # default limit, first page
+    def is_default(self, params: FilterParams) -> bool:
+        return (
+            not params.filters
+            and params.cursor is None
+            and params.offset == 0
+            and params.order_by == self.default_sort
+            and params.limit == self.default_limit
+        )
+
+    def _where(self, query, filter_names):
+        for name in filter_names:
+            column, operator = self.filters[name]
+            query = query.where(
+                OPERATORS[operator](
+                    column, bindparam(f"filter_{name}", type_=column.type)
+                )
+            )
+        return query
+
+    def _compile(self, selected, filter_names, sort_column, descending, seek, limited):
+        query = self._where(select(*selected), filter_names)
+        return keyset_statements(
+            query, sort_column, self.key_column, descending, seek, limited
+        )
+
+    # Fetch one page of the selected columns (all by default). Returns the
+    # rows and the cursor for the next page, or None on the last one.
+    async def fetch(self, db, params: FilterParams, columns=None):
+        columns = list(self.table.c) if columns is None else columns
+        descending = params.order_by.startswith("-")
+        sort_column = self.sorts[params.order_by.lstrip("-")]
+
+        # The cursor needs the sort key even when it was not asked for
+        selected = columns
+        if sort_column.name not in [column.name for column in columns]:
+            selected = columns + [sort_column]
+
+        values = {f"filter_{name}": value for name, value in params.filters.items()}
+        seek = None
+        if params.cursor is not None:
+            after = decode_keyset_cursor(sort_column, self.key_column, params.cursor)
+            values["after_value"], values["after_key"] = after
+            seek = "null" if after[0] is None else "value"
+        else:
+            values["offset"] = params.offset
+
+        filter_names = tuple(sorted(params.filters))
+        shape = (
+            tuple(column.name for column in selected),
+            filter_names,
+            params.order_by,
+            seek,
+            params.limit is not None,
+        )
+        statements = self._statements.get(shape)
+        if statements is None:
+            if len(self._statements) >= MAX_CACHED_SHAPES:
+                self._statements.clear()
+            statements = self._statements[shape] = self._compile(
+                selected,
+                filter_names,
+                sort_column,
+                descending,
+                seek,
+                params.limit is not None,
+            )
+
+        rows, next_cursor = await fetch_keyset_page(
+            db, statements, sort_column, self.key_column, params.limit, values
+        )
+        if selected is not columns:
+            rows = [project(row._mapping, columns) for row in rows]
+        return rows, next_cursor
+
+    # Number of rows matching the filters (an index range count when the
+    # filtered column is indexed)
+    async def count(self, db, params: FilterParams) -> int:
+        filter_names = tuple(sorted(params.filters))
+        shape = ("count", filter_names)
+        statement = self._statements.get(shape)
+        if statement is None:
+            statement = self._statements[shape] = self._where(
+                select(func.count()).select_from(self.table), filter_names
+            )
+        values = {f"filter_{name}": value for name, value in params.filters.items()}
+        result = await db.execute(statement, values)
+        return result.scalar()
@@ -0,0 +1,178 @@
+import os
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from sqlalchemy import Column, Integer, String, Table, make_url
+from database import Base, database_url
+
+logger = logging.getLogger(__name__)
+
+# Tables whose writes are tracked for cache invalidation
+WATCHED_TABLES = ("customers", "employees", "categories", "products")
+
+# How often the watcher looks for writes from other connections
+POLL_INTERVAL = float(os.getenv("CACHE_POLL_INTERVAL_MS", "100")) / 1000
+
+# One version per watched table, bumped by triggers on every insert, update
+# and delete, whichever process or connection made the change.
+table_versions = Table(
+    "table_versions",
+    Base.metadata,
+    Column("table_name", String(50), primary_key=True),
+    Column("version", Integer, nullable=False, default=0),
+)
+
+
+def install_change_counters(connection):
+    existing = set(
+        name.lower()
+        for (name,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    )
+    for table in WATCHED_TABLES:
+        if table not in existing:
+            continue
+        connection.exec_driver_sql(
+            f"INSERT OR IGNORE INTO table_versions (table_name, version) "
+            f"VALUES ('{table}', 0)"
+        )
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            connection.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_version_{operation.lower()} "
+                f"AFTER {operation} ON {table} BEGIN "
+                f"UPDATE table_versions SET version = version + 1 "
+                f"WHERE table_name = '{table}'; END"
+            )
+
+
+# Watches the database file for commits made by any other connection and
+# tells subscribers which tables changed. PRAGMA data_version on a dedicated
+# connection is the cheap "anything changed?" check; only when it moves is
+# table_versions read to find out which tables were touched.
+class ChangeWatcher:
+    def __init__(
+        self, url: str, interval: float = POLL_INTERVAL, max_backoff: float = 5.0
+    ):
+        database = make_url(url).database
+        if make_url(url).get_backend_name() != "sqlite" or database in (
+            None,
+            "",
+            ":memory:",
+        ):
+            # In-memory databases live in one process; explicit invalidation
+            # by the writers covers them
+            database = None
+        self.database = database
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._subscribers = {}
+        self._connection = None
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._versions = {}
+        self._failures = 0
+        self._next_check = 0.0
+        self._task = None
+
+    def subscribe(self, table: str, callback):
+        self._subscribers.setdefault(table, []).append(callback)
+
+    def notify(self, table: str):
+        for callback in self._subscribers.get(table, []):
+            callback()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                f"file:{self.database}?mode=ro", uri=True, check_same_thread=False
+            )
+        return self._connection
+
+    # Seconds until the next check; doubles after each failed one
+    def _delay(self):
+        if not self._failures:
+            return self.interval
+        return min(self.interval * 2**self._failures, self.max_backoff)
+
+    # Blocking check against the database; returns the tables that changed.
+    # A failed check changes nothing and backs off: the versions seen last
+    # are kept, so the first check that succeeds again reports what moved.
+    def _check(self, force: bool = False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and now < self._next_check:
+                return set()
+
+            try:
+                connection = self._connect()
+                (data_version,) = connection.execute("PRAGMA data_version").fetchone()
+                if data_version == self._data_version:
+                    changed = set()
+                else:
+                    versions = dict(
+                        connection.execute(
+                            "SELECT table_name, version FROM table_versions"
+                        )
+                    )
+                    changed = {
+                        table
+                        for table in set(self._subscribers) | set(versions)
+                        if versions.get(table) != self._versions.get(table)
+                    }
+                    self._data_version = data_version
+                    self._versions = versions
+                self._failures = 0
+            except sqlite3.Error as e:
+                self._failures += 1
+                logger.warning(f"Change watcher poll failed: {e}")
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+                changed = set()
+
+            self._next_check = now + self._delay()
+            return changed
+
+    # Inline check for cached reads, throttled to the interval. While the
+    # background task runs it does the checking off the event loop, and this
+    # only does anything when forced.
+    def poll(self, force: bool = False):
+        if self.database is None or (self._task is not None and not force):
+            return
+        for table in self._check(force):
+            self.notify(table)
+
+    async def _run(self):
+        while True:
+            changed = await asyncio.to_thread(self._check, True)
+            for table in changed:
+                self.notify(table)
+            await asyncio.sleep(self._delay())
+
+    def start(self):
+        if self.database is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            # Changes made while stopped are unknown; report everything next poll
+            self._data_version = None
+            self._versions = {}
+            self._failures = 0
+            self._next_check = 0.0
+
+
+change_watcher = ChangeWatcher(database_url)
@@ -1,10 +1,29 @@
 import os
-from typing import Literal
 from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from database import Base, engine
-from routes import CategoryRoute, CustomerRoute, EmployeeRoute
+from database import (
+    Base,
+    create_missing_indexes,
+    engine,
+    log_sqlite_settings,
+    read_engine,
+)
+from invalidation import change_watcher, install_change_counters
+import metrics
+from responses import enable_fast_json
+from row_counts import install_row_counters
+from search import install_customer_search
+from statements import compiled_cache_stats
+from write_queue import write_coordinator
+from routes import (
+    AdminRoute,
+    CategoryRoute,
+    CustomerRoute,
+    EmployeeRoute,
+    OrderRoute,
+    ProductRoute,
+)
 import logging
 from contextlib import asynccontextmanager
 
@@ -23,18 +42,40 @@ app = FastAPI(
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_indexes)
+        await conn.run_sync(install_row_counters)
+        await conn.run_sync(install_change_counters)
+        await conn.run_sync(install_customer_search)
 
 
 # Lifespan event handler
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    await log_sqlite_settings()
+    change_watcher.start()
     yield
-    # Add any cleanup code here if needed
+    await change_watcher.stop()
+    await write_coordinator.stop()
+    logger.info(f"Compiled statement cache: {compiled_cache_stats.snapshot()}")
+    await read_engine.dispose()
+    await engine.dispose()
 
 
 app = FastAPI(lifespan=lifespan)
 
+# Encode responses with orjson straight from ORM rows; set FAST_JSON=false to
+# fall back to jsonable_encoder + stdlib json
+enable_fast_json(os.getenv("FAST_JSON", "true").lower() not in ("0", "false", "no"))
+
+# Count compiled-cache hits and misses on both engines
+compiled_cache_stats.track(engine)
+compiled_cache_stats.track(read_engine)
+
+# Request, database and pool metrics, scraped from /metrics
+metrics.track_engine(engine, "writer")
+metrics.track_engine(read_engine, "reader")
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -45,13 +86,21 @@ app.add_middleware(
 )
 
 
-class FilterParams(BaseModel):
-    limit: int = Field(100, gt=0, le=100)
-    offset: int = Field(0, ge=0)
-    order_by: Literal["created_at", "updated_at"] = "created_at"
-    tags: list[str] = []
+# Added last so it wraps everything, CORS included
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+# Prometheus text exposition of the counters in metrics.py
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 app.include_router(CustomerRoute.router, prefix="/api/v1", tags=["Customers"])
 app.include_router(EmployeeRoute.router, prefix="/api/v1", tags=["Employees"])
 app.include_router(CategoryRoute.router, prefix="/api/v1", tags=["Categories"])
+app.include_router(ProductRoute.router, prefix="/api/v1", tags=["Products"])
+app.include_router(OrderRoute.router, prefix="/api/v1", tags=["Orders"])
+app.include_router(AdminRoute.router, prefix="/api/v1", tags=["Admin"])
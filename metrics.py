@@ -0,0 +1,273 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+from statements import compiled_cache_stats
+
+# In-process metrics in the Prometheus text format. Everything is updated
+# from the event loop thread (SQLAlchemy events included, as the async
+# engines run them in the loop), so plain dict and int updates need no locks.
+
+# Seconds; the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        registry.append(self)
+
+    def samples(self):
+        for values, value in self.values.items():
+            yield self.name, self.labels, values, value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for name, label_names, label_values, value in self.samples():
+            lines.append(f"{name}{_format_labels(label_names, label_values)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        state = self.values.get(labels)
+        if state is None:
+            # Per-bucket counts (made cumulative when rendered), sum
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def samples(self):
+        bucket_labels = self.labels + ("le",)
+        for values, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                bucket = values + (bound,)
+                yield f"{self.name}_bucket", bucket_labels, bucket, cumulative
+            yield f"{self.name}_sum", self.labels, values, total
+            yield f"{self.name}_count", self.labels, values, cumulative
+
+
+# Values read at scrape time from state kept elsewhere
+class Collected(Metric):
+    def __init__(self, name: str, help: str, labels=(), collect=None, type="gauge"):
+        super().__init__(name, help, labels)
+        self.collect = collect
+        self.type = type
+
+    def samples(self):
+        for values, value in self.collect():
+            yield self.name, self.labels, values, value
+
+
+registry = []
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests served", ("method", "route", "status")
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, including streamed bodies",
+    ("method", "route"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+db_queries_per_request = Histogram(
+    "http_request_db_queries",
+    "Database statements executed per HTTP request",
+    ("method", "route"),
+    QUERY_COUNT_BUCKETS,
+)
+db_time_per_request = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database statements per HTTP request",
+    ("method", "route"),
+    DB_TIME_BUCKETS,
+)
+db_queries = Counter("db_queries_total", "Database statements executed", ("engine",))
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Database statement latency",
+    ("engine",),
+    DB_TIME_BUCKETS,
+)
+pool_wait = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ("engine",),
+    POOL_WAIT_BUCKETS,
+)
+cache_requests = Counter(
+    "cache_requests_total", "Cache lookups by outcome", ("cache", "result")
+)
+
+
+# Per-request database tally, attributed through a context variable
+class RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+current_request = ContextVar("metrics_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(engine_name):
+    def after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        db_queries.inc((engine_name,))
+        db_query_duration.observe((engine_name,), elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+    return after
+
+
+# A failed statement never reaches after_cursor_execute; drop its timer
+def _handle_error(context):
+    started = (
+        context.connection.info.get("metrics_started") if context.connection else None
+    )
+    if started:
+        started.pop()
+
+
+# Time statements and pool checkouts on an engine, labelled with name
+def track_engine(engine, name: str):
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        # Same engine under another name (e.g. in-memory reader = writer)
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute(name))
+    event.listen(sync_engine, "handle_error", _handle_error)
+    if hasattr(sync_engine.pool, "on_wait"):
+        sync_engine.pool.on_wait = lambda seconds: pool_wait.observe((name,), seconds)
+
+
+# SQLAlchemy's compiled statement cache, counted by statements.py
+def _compiled_cache():
+    yield ("hit",), compiled_cache_stats.hits
+    yield ("miss",), compiled_cache_stats.misses
+    yield ("uncached",), compiled_cache_stats.uncached
+
+
+compiled_cache_requests = Collected(
+    "sqlalchemy_compiled_cache_total",
+    "Statement executions by compiled cache outcome",
+    ("result",),
+    _compiled_cache,
+    type="counter",
+)
+
+
+# Ratio of hits to lookups per cache, derived from cache_requests
+def _hit_ratios():
+    totals = {}
+    for (cache, result), value in list(cache_requests.values.items()):
+        hits, lookups = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (value if result == "hit" else 0), lookups + value)
+    for cache, (hits, lookups) in totals.items():
+        if lookups:
+            yield (cache,), hits / lookups
+    if compiled_cache_stats.hit_rate is not None:
+        yield ("compiled_statements",), compiled_cache_stats.hit_rate
+
+
+cache_hit_ratio = Collected(
+    "cache_hit_ratio", "Share of cache lookups that were hits", ("cache",), _hit_ratios
+)
+
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# ASGI middleware recording count, latency and database work per route. The
+# route label is the matched path template, so ids do not explode the label
+# space; requests that match no route share "unmatched".
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+        stats = RequestStats()
+        token = current_request.set(stats)
+        http_requests_in_flight.inc()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            current_request.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route else "unmatched")
+            http_requests.inc(labels + (str(status),))
+            http_request_duration.observe(labels, time.perf_counter() - started)
+            db_queries_per_request.observe(labels, stats.queries)
+            db_time_per_request.observe(labels, stats.db_time)
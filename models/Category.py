@@ -1,6 +1,6 @@
 # models/Category.py
 from typing import Optional
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 from pydantic import BaseModel, ConfigDict
 from database import Base
@@ -14,6 +14,11 @@ class Category(Base):
     category_name: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
 
+    # Name lookups and ordering; the primary key is the keyset tie-breaker
+    __table_args__ = (
+        Index("ix_categories_category_name", "category_name", "category_id"),
+    )
+
 
 # Pydantic models
 class CategoryBase(BaseModel):
@@ -1,5 +1,5 @@
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Index, Integer, String, Text
 from sqlalchemy.ext.declarative import declarative_base
 from pydantic import BaseModel, EmailStr, ConfigDict, ValidationError
 from database import Base
@@ -18,6 +18,13 @@ class Customer(Base):
     city = Column(String(50))
     country = Column(String(50))
 
+    # Filter/sort indexes; the primary key doubles as the keyset tie-breaker
+    __table_args__ = (
+        Index("ix_customers_last_name", "last_name", "customer_id"),
+        Index("ix_customers_city", "city", "customer_id"),
+        Index("ix_customers_country", "country", "customer_id"),
+    )
+
 
 # Pydantic base model with shared configuration
 class CustomerBase(BaseModel):
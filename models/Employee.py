@@ -1,10 +1,8 @@
 from datetime import date
 from typing import Optional
-from sqlalchemy import DECIMAL, Column, Date, Integer, String
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import DECIMAL, Column, Date, Index, Integer, String
 from pydantic import BaseModel, ConfigDict
-
-Base = declarative_base()
+from database import Base
 
 
 class Employee(Base):
@@ -17,6 +15,13 @@ class Employee(Base):
     hire_date = Column(Date)
     salary = Column(DECIMAL(10, 2))
 
+    # Filter/sort indexes; the primary key doubles as the keyset tie-breaker
+    __table_args__ = (
+        Index("ix_employees_position", "position", "employee_id"),
+        Index("ix_employees_hire_date", "hire_date", "employee_id"),
+        Index("ix_employees_salary", "salary", "employee_id"),
+    )
+
 
 class EmployeeBase(BaseModel):
     first_name: str
@@ -0,0 +1,44 @@
+from typing import Optional
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+from pydantic import BaseModel, Field
+from database import Base
+
+
+# SQLAlchemy models, over the Orders and OrderItems tables from Script.sql
+class Order(Base):
+    __tablename__ = "orders"
+
+    order_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    customer_id = Column(Integer, ForeignKey("customers.customer_id"), nullable=False)
+    order_date = Column(DateTime, server_default=func.current_timestamp())
+    status = Column(String(20), server_default="Pending")
+    employee_id = Column(Integer, ForeignKey("employees.employee_id"))
+    total_amount = Column(Float)
+
+    __table_args__ = (Index("ix_orders_customer_id", "customer_id", "order_id"),)
+
+
+class OrderItem(Base):
+    __tablename__ = "orderitems"
+
+    order_item_id = Column(Integer, primary_key=True, autoincrement=True)
+    order_id = Column(Integer, ForeignKey("orders.order_id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.product_id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price_per_unit = Column(Float, nullable=False)
+
+    # Items are always read by their order
+    __table_args__ = (Index("ix_orderitems_order_id", "order_id"),)
+
+
+# Pydantic models
+class OrderItemCreate(BaseModel):
+    product_id: int
+    quantity: int = Field(gt=0)
+
+
+class OrderCreate(BaseModel):
+    customer_id: int
+    employee_id: Optional[int] = None
+    items: list[OrderItemCreate] = Field(min_length=1, max_length=100)
@@ -0,0 +1,45 @@
+from typing import Optional
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer, String
+from pydantic import BaseModel, ConfigDict, Field
+from database import Base
+
+
+# SQLAlchemy model, over the Products table from Script.sql
+class Product(Base):
+    __tablename__ = "products"
+
+    product_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    product_name = Column(String(100), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.category_id"), nullable=False)
+    price = Column(Float, nullable=False)
+    stock_quantity = Column(Integer, nullable=False)
+    supplier_id = Column(Integer)
+
+    # Filter/sort indexes; the primary key doubles as the keyset tie-breaker
+    __table_args__ = (
+        Index("ix_products_category_id", "category_id", "product_id"),
+        Index("ix_products_price", "price", "product_id"),
+    )
+
+
+# Pydantic models
+class ProductBase(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    product_name: str
+    category_id: int
+    price: float = Field(ge=0)
+    stock_quantity: int = Field(ge=0)
+    supplier_id: Optional[int] = None
+
+
+class ProductRead(ProductBase):
+    product_id: int
+
+
+class ProductCreate(ProductBase):
+    pass
+
+
+class ProductUpdate(ProductBase):
+    pass
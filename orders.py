@@ -0,0 +1,109 @@
+from fastapi import HTTPException
+from sqlalchemy import Integer, bindparam, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import begin_immediate
+from statements import select_by_id
+from models.Customer import Customer
+from models.Employee import Employee
+from models.Order import Order, OrderCreate, OrderItem
+from models.Product import Product
+
+products = Product.__table__
+orders = Order.__table__
+order_items = OrderItem.__table__
+
+_quantity = bindparam("quantity", type_=Integer)
+
+# Take stock only if enough is left, returning the price it sold at. The
+# check and the decrement are one statement, so stock can never go negative.
+_take_stock = (
+    update(products)
+    .where(
+        products.c.product_id == bindparam("id", type_=Integer),
+        products.c.stock_quantity >= _quantity,
+    )
+    .values(stock_quantity=products.c.stock_quantity - _quantity)
+    .returning(products.c.price)
+)
+_insert_order = insert(orders).returning(*orders.c)
+_insert_items = insert(order_items)
+
+
+# Place an order in one short BEGIN IMMEDIATE transaction: check the customer
+# (and employee), take stock for each product with a conditional UPDATE,
+# insert the order with its computed total and executemany its items. The
+# write lock is held from the first statement, so concurrent orders queue on
+# busy_timeout rather than failing to upgrade a read lock, and none of them
+# can oversell. Any failure rolls the whole order back.
+async def place_order(db: AsyncSession, order: OrderCreate):
+    # Repeated products are checked against their combined quantity
+    quantities = {}
+    for item in order.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+    try:
+        await begin_immediate(db)
+        await _require(db, Customer, order.customer_id, "Customer not found")
+        if order.employee_id is not None:
+            await _require(db, Employee, order.employee_id, "Employee not found")
+
+        items = []
+        for product_id, quantity in quantities.items():
+            result = await db.execute(
+                _take_stock, {"id": product_id, "quantity": quantity}
+            )
+            price = result.scalar()
+            if price is None:
+                await _raise_stock_error(db, product_id, quantity)
+            items.append(
+                {
+                    "product_id": product_id,
+                    "quantity": quantity,
+                    "price_per_unit": price,
+                }
+            )
+
+        total = round(
+            sum(item["quantity"] * item["price_per_unit"] for item in items), 2
+        )
+        result = await db.execute(
+            _insert_order,
+            {
+                "customer_id": order.customer_id,
+                "employee_id": order.employee_id,
+                "total_amount": total,
+            },
+        )
+        placed = dict(result.mappings().one())
+        await db.execute(
+            _insert_items,
+            [{"order_id": placed["order_id"], **item} for item in items],
+        )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    return {**placed, "items": items}
+
+
+async def _require(db: AsyncSession, model, key, detail: str):
+    pk = model.__table__.primary_key.columns.values()[0]
+    result = await db.execute(select_by_id(model, [pk]), {"id": key})
+    if result.first() is None:
+        raise HTTPException(status_code=404, detail=detail)
+
+
+# The conditional UPDATE matched nothing: unknown product or too little stock
+async def _raise_stock_error(db: AsyncSession, product_id: int, quantity: int):
+    result = await db.execute(
+        select_by_id(Product, [products.c.stock_quantity]), {"id": product_id}
+    )
+    stock = result.scalar()
+    if stock is None:
+        raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
+    raise HTTPException(
+        status_code=409,
+        detail=f"Insufficient stock for product {product_id}: "
+        f"{quantity} requested, {stock} available",
+    )
@@ -0,0 +1,147 @@
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+from fastapi import HTTPException
+from sqlalchemy import Integer, bindparam, tuple_
+
+
+# Keyset (cursor) pagination helpers. A cursor is an opaque, URL-safe token
+# wrapping the last key a client has seen, so the next page can be fetched
+# with "WHERE key > :after" instead of an OFFSET scan.
+def encode_cursor(after) -> str:
+    raw = json.dumps({"after": after}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+
+
+# Convert a cursor value back to the column's Python type (dates and
+# decimals travel as JSON strings/floats)
+def _coerce(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(str(value))
+    return value
+
+
+def _to_json(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+# Keyset pagination over a possibly non-unique, nullable sort column, with the
+# primary key as tie-breaker. SQLite sorts NULLs first ascending and last
+# descending, so past a cursor the ordering is walked as two segments (NULL
+# and non-NULL values). Each segment is read with its own index seek; mixing
+# them with OR makes SQLite sort the whole remaining range instead. A page
+# without a cursor needs no seek and is one ordered (offset) read.
+#
+# The statements depend only on the shape of the request - seek is None on a
+# first page, else "null" or "value" for the cursor's sort value - so they
+# can be built once and reused. Seek values, offset and row limit are bind
+# parameters (:after_value, :after_key, :offset, :limit) filled in by
+# fetch_keyset_page.
+def keyset_statements(
+    query, column, key_column, descending=False, seek=None, limited=True
+):
+    key_order = key_column.desc() if descending else key_column.asc()
+    column_order = column.desc() if descending else column.asc()
+    after_value = bindparam("after_value", type_=column.type)
+    after_key = bindparam("after_key", type_=key_column.type)
+
+    if seek is None:
+        order = [key_order] if column is key_column else [column_order, key_order]
+        segments = [([], order)]
+    elif column is key_column:
+        segments = [([_seek(key_column, after_key, descending)], [key_order])]
+    else:
+        null_segment = ([column.is_(None)], [key_order])
+        value_segment = ([column.isnot(None)], [column_order, key_order])
+        if seek == "null":
+            null_segment = (
+                [column.is_(None), _seek(key_column, after_key, descending)],
+                [key_order],
+            )
+            value_segment = None if descending else value_segment
+        else:
+            value_segment = (
+                [
+                    _seek(
+                        tuple_(column, key_column),
+                        tuple_(after_value, after_key),
+                        descending,
+                    )
+                ],
+                [column_order, key_order],
+            )
+            null_segment = null_segment if descending else None
+        segments = [null_segment, value_segment]
+        if descending:
+            segments.reverse()
+
+    statements = []
+    for segment in segments:
+        if segment is None:
+            continue
+        conditions, order = segment
+        statement = query.where(*conditions).order_by(*order)
+        if seek is None:
+            statement = statement.offset(bindparam("offset", type_=Integer))
+        if limited:
+            statement = statement.limit(bindparam("limit", type_=Integer))
+        statements.append(statement)
+    return statements
+
+
+# Run keyset_statements in order until the page (plus one row, to know
+# whether another follows) is full. The query should select columns; the
+# page comes back as result rows.
+async def fetch_keyset_page(db, statements, column, key_column, limit, params):
+    rows = []
+    for statement in statements:
+        values = dict(params)
+        if limit is not None:
+            values["limit"] = limit + 1 - len(rows)
+        result = await db.execute(statement, values)
+        rows += result.all()
+        if limit is not None and len(rows) > limit:
+            break
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(
+            [_to_json(getattr(rows[-1], column.key)), getattr(rows[-1], key_column.key)]
+        )
+    return rows, next_cursor
+
+
+def _seek(left, right, descending):
+    return left < right if descending else left > right
+
+
+# Cursors are [sort value, key] pairs. Cursors from the original customer
+# list wrap just the key; they are still accepted when paging by the key.
+def decode_keyset_cursor(column, key_column, cursor: str):
+    try:
+        after = decode_cursor(cursor)
+        if column is key_column and isinstance(after, int):
+            return after, after
+        value, key = after
+        return _coerce(column, value), key
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
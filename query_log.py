@@ -0,0 +1,174 @@
+import os
+import re
+import time
+import logging
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged with their parameters and plan
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+# A full SCAN is flagged when the table holds at least this many rows
+SLOW_QUERY_SCAN_ROWS = int(os.getenv("SLOW_QUERY_SCAN_ROWS", "10000"))
+
+# Distinct normalized statements kept for the top-N report
+QUERY_LOG_MAX_STATEMENTS = int(os.getenv("QUERY_LOG_MAX_STATEMENTS", "1000"))
+
+# Statements worth a query plan (not PRAGMAs, DDL or transaction control)
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+_strings = re.compile(r"'(?:[^']|'')*'")
+_numbers = re.compile(r"\b\d+(?:\.\d+)?\b")
+_in_lists = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_whitespace = re.compile(r"\s+")
+_scans = re.compile(r"^SCAN (\w+)")
+
+
+# One shape of SQL: literals become ?, IN lists collapse, whitespace folds
+def normalize(statement: str) -> str:
+    statement = _strings.sub("?", statement)
+    statement = _numbers.sub("?", statement)
+    statement = _in_lists.sub("(?, ...)", statement)
+    return _whitespace.sub(" ", statement).strip()
+
+
+class StatementStats:
+    __slots__ = ("calls", "total", "max", "slow_calls", "params", "plan", "scans")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow_calls = 0
+        self.params = None  # of the slowest call
+        self.plan = None  # captured the first time the statement is slow
+        self.scans = []  # large tables the plan reads in full
+
+    def as_dict(self, statement: str):
+        return {
+            "statement": statement,
+            "calls": self.calls,
+            "slow_calls": self.slow_calls,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.calls, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "params": self.params,
+            "plan": self.plan,
+            "scans": self.scans,
+        }
+
+
+# Times every statement run through the tracked engines, aggregated by
+# normalized SQL. Slow ones are logged with their parameters and their
+# EXPLAIN QUERY PLAN, which is run on the same connection through a fresh
+# driver cursor, so it does not re-enter these events.
+class QueryLog:
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        scan_rows: int = SLOW_QUERY_SCAN_ROWS,
+        max_statements: int = QUERY_LOG_MAX_STATEMENTS,
+    ):
+        self.threshold = threshold_ms / 1000
+        self.scan_rows = scan_rows
+        self.max_statements = max_statements
+        self.statements = {}
+
+    def track(self, engine):
+        sync_engine = engine.sync_engine
+        if event.contains(sync_engine, "before_cursor_execute", self._before):
+            return
+        event.listen(sync_engine, "before_cursor_execute", self._before)
+        event.listen(sync_engine, "after_cursor_execute", self._after)
+        event.listen(sync_engine, "handle_error", self._error)
+
+    def reset(self):
+        self.statements.clear()
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_log_started", []).append(time.perf_counter())
+
+    def _error(self, context):
+        if context.connection is not None:
+            started = context.connection.info.get("query_log_started")
+            if started:
+                started.pop()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_log_started"].pop()
+        key = normalize(statement)
+        stats = self.statements.get(key)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                return
+            stats = self.statements[key] = StatementStats()
+        stats.calls += 1
+        stats.total += elapsed
+        if elapsed > stats.max:
+            stats.max = elapsed
+            stats.params = _shorten(parameters)
+
+        if elapsed < self.threshold:
+            return
+        stats.slow_calls += 1
+        if stats.plan is None and not executemany:
+            stats.plan, stats.scans = self._explain(conn, statement, parameters)
+        message = (
+            f"Slow query ({elapsed * 1000:.1f} ms): {key} "
+            f"params={_shorten(parameters)} plan={stats.plan}"
+        )
+        if stats.scans:
+            message += f" FULL SCAN of large table(s): {', '.join(stats.scans)}"
+        logger.warning(message)
+
+    def _explain(self, conn, statement, parameters):
+        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return [], []
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plan = [row[3] for row in cursor.fetchall()]
+            scans = []
+            for line in plan:
+                match = _scans.match(line)
+                if match and self._row_count(cursor, match.group(1)) >= self.scan_rows:
+                    scans.append(match.group(1))
+            return plan, scans
+        except Exception as e:
+            logger.warning(f"EXPLAIN QUERY PLAN failed: {e}")
+            return [], []
+        finally:
+            cursor.close()
+
+    # Size from the trigger-maintained row_counts; unknown tables count as 0
+    def _row_count(self, cursor, table: str) -> int:
+        try:
+            cursor.execute(
+                "SELECT row_count FROM row_counts WHERE table_name = ?", (table,)
+            )
+            row = cursor.fetchone()
+        except Exception:
+            return 0
+        return row[0] if row else 0
+
+    # Slowest statements, by total, mean or max time
+    def top(self, limit: int = 10, order: str = "total"):
+        def sort_key(item):
+            stats = item[1]
+            if order == "mean":
+                return stats.total / stats.calls
+            if order == "max":
+                return stats.max
+            return stats.total
+
+        ranked = sorted(self.statements.items(), key=sort_key, reverse=True)
+        return [stats.as_dict(statement) for statement, stats in ranked[:limit]]
+
+
+def _shorten(parameters, limit: int = 500):
+    text = repr(parameters)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+query_log = QueryLog()
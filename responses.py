@@ -0,0 +1,66 @@
+from decimal import Decimal
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.engine import Row
+from database import Base
+
+# Toggled from main.py; off means the stdlib json encoder is used instead
+fast_json_enabled = True
+
+
+def enable_fast_json(enabled: bool):
+    global fast_json_enabled
+    fast_json_enabled = enabled
+
+
+# Column keys per mapped class, looked up once
+_column_keys = {}
+
+
+def _orm_to_dict(obj):
+    cls = type(obj)
+    keys = _column_keys.get(cls)
+    if keys is None:
+        keys = _column_keys[cls] = [attr.key for attr in inspect(cls).column_attrs]
+    return {key: getattr(obj, key) for key in keys}
+
+
+# Fallback for types orjson does not know natively (it already handles
+# dict/list/str/int/float/date/datetime)
+def to_jsonable(obj):
+    if isinstance(obj, Base):
+        return _orm_to_dict(obj)
+    if isinstance(obj, Row):
+        return obj._asdict()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=to_jsonable)
+
+
+# Return handler results as a ready-made response. ORM entities and Core
+# rows are encoded straight to bytes, so FastAPI's response_model validation
+# and jsonable_encoder pass are skipped entirely.
+def json_response(content, status_code: int = 200, headers: dict = None):
+    if fast_json_enabled:
+        return FastJSONResponse(content, status_code=status_code, headers=headers)
+    return JSONResponse(
+        jsonable_encoder(
+            content,
+            custom_encoder={
+                Base: lambda obj: jsonable_encoder(_orm_to_dict(obj)),
+                Row: lambda row: jsonable_encoder(row._asdict()),
+            },
+        ),
+        status_code=status_code,
+        headers=headers,
+    )
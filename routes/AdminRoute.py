@@ -0,0 +1,45 @@
+import os
+import secrets
+from typing import Literal, Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from query_log import query_log
+from responses import json_response
+
+router = APIRouter()
+
+# Admin routes require this in the X-Admin-Token header, and are refused
+# outright while it is unset: the query log holds bound parameters
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def check_admin_token(token: Optional[str]):
+    # Constant-time comparison, so response timing leaks nothing of the token
+    if (
+        not ADMIN_TOKEN
+        or token is None
+        or not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+    ):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+
+# Slowest normalized statements since startup (or the last reset)
+@router.get("/admin/slow-queries", response_model=dict, status_code=200)
+async def get_slow_queries(
+    limit: int = Query(10, ge=1, le=100),
+    order: Literal["total", "mean", "max"] = Query("total"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    check_admin_token(x_admin_token)
+    return json_response(
+        {
+            "threshold_ms": query_log.threshold * 1000,
+            "statements": query_log.top(limit, order),
+        }
+    )
+
+
+@router.delete("/admin/slow-queries", response_model=dict, status_code=200)
+async def reset_slow_queries(x_admin_token: Optional[str] = Header(None)):
+    check_admin_token(x_admin_token)
+    query_log.reset()
+    return json_response({"message": "Query log cleared"})
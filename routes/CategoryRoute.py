@@ -1,7 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_db
+from bulk import bulk_insert
+from crud import delete_returning, update_returning
+from etag import (
+    cache_headers,
+    conditional_response,
+    make_etag,
+    not_modified,
+    request_etag,
+)
+from singleflight import coalesced_get, single_flight
+from statements import select_by_id
+from fields import project, select_fields
+from filters import FilterParams, ListQuery
+from export import export_table
+from database import ReadSessionLocal, get_read_db, get_write_db
+from invalidation import change_watcher
+from metrics import cache_requests
+from responses import json_response
+from write_queue import group_commit_enabled, write_coordinator
 from models.Category import (
     Category as CategoryModel,
     CategoryCreate,
@@ -16,16 +36,90 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+# Process-local copy of the whole categories table, indexed by id and name.
+# Writes in this module invalidate it directly; writes from other workers or
+# processes reach it through the change watcher subscription.
+class CategorySnapshot:
+    def __init__(self, rows):
+        self.rows = rows
+        self.by_id = {row["category_id"]: row for row in rows}
+        self.by_name = {row["category_name"]: row for row in rows}
+        # Content hash, so conditional GETs are answered without the database
+        self.version = make_etag(orjson.dumps(rows))
+
+
+class CategoryCache:
+    def __init__(self):
+        self._snapshot = None
+        self._generation = 0
+
+    def invalidate(self):
+        self._snapshot = None
+        self._generation += 1
+
+    async def load(self) -> CategorySnapshot:
+        change_watcher.poll()
+        if self._snapshot is not None:
+            cache_requests.inc(("categories", "hit"))
+            return self._snapshot
+        cache_requests.inc(("categories", "miss"))
+        # Concurrent misses share a single reload
+        return await single_flight.do("category_cache", self._reload)
+
+    # Reloads open their own read session: the load is shared by every
+    # concurrent caller, and must never run on a writer session
+    async def _reload(self) -> CategorySnapshot:
+        generation = self._generation
+        async with ReadSessionLocal() as db:
+            result = await db.execute(
+                select(*CategoryModel.__table__.c).order_by(CategoryModel.category_id)
+            )
+        snapshot = CategorySnapshot([dict(row) for row in result.mappings()])
+        # Only keep it if no write invalidated the cache while loading
+        if generation == self._generation:
+            self._snapshot = snapshot
+        return snapshot
+
+
+category_cache = CategoryCache()
+change_watcher.subscribe("categories", category_cache.invalidate)
+
+
+# Whitelisted filters and sorts for the category list. Unpaged by default,
+# as the plain listing is served from the cache.
+category_query = ListQuery(
+    CategoryModel,
+    filters={"category_name": ("category_name", "eq")},
+    sorts=("category_id", "category_name"),
+    default_limit=None,
+)
+
+
 # routes/CategoryRoute.py
 @router.get("/categories/", response_model=list[CategoryRead], status_code=200)
-async def get_categories(db: AsyncSession = Depends(get_db)):
+async def get_categories(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    params: FilterParams = Depends(category_query.params),
+    fields: Optional[str] = Query(None),  # e.g. category_id,category_name
+):
     try:
-        query = select(CategoryModel)
-        result = await db.execute(query)
-        categories = result.scalars().all()
+        columns = select_fields(CategoryModel, fields)
+        if not category_query.is_default(params):
+            return await query_categories(db, request, params, columns)
+
+        snapshot = await category_cache.load()
+        etag = request_etag(request, snapshot.version)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+
+        categories = snapshot.rows
+        if fields is not None:
+            categories = [project(category, columns) for category in categories]
 
         if not categories:
-            return []
+            return json_response([], headers=cache_headers(etag))
 
         # Convert to dict and exclude ID
         # return [
@@ -35,87 +129,167 @@ async def get_categories(db: AsyncSession = Depends(get_db)):
         #     for category in categories
         # ]
 
-        return [CategoryRead.model_validate(category) for category in categories]
+        return json_response(categories, headers=cache_headers(etag))
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error retrieving categories: {e}")
         raise HTTPException(status_code=500, detail="Error retrieving categories.")
 
 
+# Filtered, reordered or paged listings go to the database. The body stays a
+# plain list, so the next page is linked from the Link header.
+async def query_categories(db: AsyncSession, request: Request, params, columns):
+    categories, next_cursor = await category_query.fetch(db, params, columns)
+    headers = {}
+    if next_cursor is not None:
+        # The cursor replaces the offset, which must not be applied again
+        next_url = request.url.remove_query_params("offset").include_query_params(
+            cursor=next_cursor
+        )
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return conditional_response(request, json_response(categories, headers=headers))
+
+
+# Export the whole table as NDJSON or CSV
+@router.get("/categories/export", status_code=200)
+async def export_categories(format: Literal["ndjson", "csv"] = Query("ndjson")):
+    return export_table(CategoryModel, format, "categories")
+
+
 @router.get("/categories/{category_id}", response_model=CategoryRead, status_code=200)
-async def get_category(category_id: int, db: AsyncSession = Depends(get_db)):
-    try:
-        query = select(CategoryModel).filter(CategoryModel.category_id == category_id)
-        result = await db.execute(query)
-        category = result.scalars().first()
+async def get_category(
+    category_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None),  # e.g. category_id,category_name
+):
+    # Concurrent identical requests share this lookup and its encoded body
+    async def fetch():
+        category = snapshot.by_id.get(category_id)
 
         if not category:
             raise HTTPException(status_code=404, detail="Category not found.")
 
-        return CategoryRead.model_validate(category)
+        if fields is not None:
+            category = project(category, columns)
+
+        return json_response(category, headers=cache_headers(etag))
+
+    try:
+        columns = select_fields(CategoryModel, fields)
+
+        # Answer conditional requests before joining the shared lookup
+        snapshot = await category_cache.load()
+        etag = request_etag(request, snapshot.version)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+
+        return await coalesced_get(request, fetch)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error retrieving category: {e}")
         raise HTTPException(status_code=500, detail="Error retrieving category.")
 
 
 @router.post("/categories/", response_model=CategoryRead, status_code=201)
-async def create_category(category: CategoryCreate, db: AsyncSession = Depends(get_db)):
+async def create_category(
+    category: CategoryCreate, db: AsyncSession = Depends(get_write_db)
+):
     try:
-        # Check if category already exists
-        result = await db.execute(
-            select(CategoryModel).filter(
-                CategoryModel.category_name == category.category_name
-            )
-        )
-        existing_category = result.scalars().first()
-        if existing_category:
+        # Check if category already exists. The cache loads through the read
+        # pool: the group commit flush needs the single writer connection, so
+        # holding it here would leave the flush waiting on this request.
+        cache = await category_cache.load()
+        if category.category_name in cache.by_name:
             raise HTTPException(status_code=400, detail="Category already exists.")
 
+        if group_commit_enabled("categories"):
+            values = category.model_dump()
+            category_id = await write_coordinator.insert(CategoryModel, values)
+            category_cache.invalidate()
+            return json_response(
+                {"category_id": category_id, **values}, status_code=201
+            )
+
         new_category = CategoryModel(**category.dict())
         db.add(new_category)
         await db.commit()
         await db.refresh(new_category)
-        return CategoryRead.model_validate(new_category)
+        category_cache.invalidate()
+        return json_response(new_category, status_code=201)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating category: {e}")
         raise HTTPException(status_code=500, detail="Error creating category.")
 
 
-@router.put("/categories/{category_id}", response_model=CategoryRead, status_code=200)
-async def update_category(
-    category_id: int, category: CategoryRead, db: AsyncSession = Depends(get_db)
+# Create categories in bulk from a JSON array or an NDJSON stream
+@router.post("/categories/bulk", response_model=dict, status_code=200)
+async def create_categories_bulk(
+    request: Request, db: AsyncSession = Depends(get_write_db)
 ):
     try:
-        # Check if category exists
-        query = select(CategoryModel).filter(CategoryModel.category_id == category_id)
-        result = await db.execute(query)
-        existing_category = result.scalars().first()
+        try:
+            results = await bulk_insert(
+                db,
+                request,
+                CategoryModel,
+                CategoryCreate,
+                unique_field="category_name",
+            )
+        finally:
+            # Chunks commit independently, so some may have landed
+            category_cache.invalidate()
+        return json_response(results)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk creating categories: {e}")
+        raise HTTPException(status_code=500, detail="Error creating categories.")
 
-        if not existing_category:
-            raise HTTPException(status_code=404, detail="Category not found.")
 
-        # Check if new category name already exists (excluding current category)
-        name_check = await db.execute(
-            select(CategoryModel).filter(
+@router.put("/categories/{category_id}", response_model=CategoryRead, status_code=200)
+async def update_category(
+    category_id: int, category: CategoryRead, db: AsyncSession = Depends(get_write_db)
+):
+    try:
+        # Update in one statement, guarded against taking another category's name
+        duplicate_name = (
+            select(CategoryModel.category_id)
+            .filter(
                 CategoryModel.category_name == category.category_name,
                 CategoryModel.category_id != category_id,
             )
+            .exists()
+        )
+        updated_category = await update_returning(
+            db,
+            CategoryModel,
+            CategoryModel.category_id,
+            category_id,
+            category.model_dump(exclude_unset=True),
+            conditions=(~duplicate_name,),
+            raise_not_found=False,
         )
-        duplicate_name = name_check.scalars().first()
 
-        if duplicate_name:
+        if updated_category is None:
+            # Nothing updated: only now find out whether it was missing or a clash
+            result = await db.execute(
+                select_by_id(CategoryModel, [CategoryModel.__table__.c.category_id]),
+                {"id": category_id},
+            )
+            if result.first() is None:
+                raise HTTPException(status_code=404, detail="Category not found.")
             raise HTTPException(
                 status_code=400,
                 detail=f"Category with name '{category.category_name}' already exists",
             )
 
-        # Update category
-        for key, value in category.model_dump(exclude_unset=True).items():
-            setattr(existing_category, key, value)
-
-        await db.commit()
-        await db.refresh(existing_category)
-
-        return CategoryRead.model_validate(existing_category)
+        category_cache.invalidate()
+        return json_response(updated_category)
     except HTTPException:
         raise
     except Exception as e:
@@ -124,47 +298,24 @@ async def update_category(
 
 
 @router.delete("/categories/{category_id}", response_model={}, status_code=200)
-async def delete_category(category_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_category(category_id: int, db: AsyncSession = Depends(get_write_db)):
     try:
-        # Check if category exists
-        query = select(CategoryModel).filter(CategoryModel.category_id == category_id)
-        result = await db.execute(query)
-        existing_category = result.scalars().first()
-
-        if not existing_category:
-            raise HTTPException(status_code=404, detail="Category not found.")
-
-        # Delete with proper async session management
-        await db.delete(existing_category)
-
-        # Commit the transaction
-        try:
-            await db.commit()
-        except Exception as commit_error:
-            await db.rollback()
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to commit delete operation: {str(commit_error)}",
-            )
-
-        # Verify deletion
-        verify_query = select(CategoryModel).filter(
-            CategoryModel.category_id == category_id
+        await delete_returning(
+            db,
+            CategoryModel,
+            CategoryModel.category_id,
+            category_id,
+            detail="Category not found.",
         )
-        verify_result = await db.execute(verify_query)
-        if verify_result.scalars().first():
-            await db.rollback()
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to delete category - still exists after deletion",
-            )
+        category_cache.invalidate()
 
-        return {"message": "Category deleted successfully", "category_id": category_id}
+        return json_response(
+            {"message": "Category deleted successfully", "category_id": category_id}
+        )
 
     except HTTPException:
         raise
     except Exception as e:
-        await db.rollback()
         print(f"Error deleting category: {e}")
         raise HTTPException(
             status_code=500, detail=f"Error deleting category: {str(e)}"
@@ -1,7 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from database import get_db
+from bulk import bulk_insert
+from crud import delete_returning, update_returning
+from etag import conditional_response, tag_response
+from fields import select_fields
+from filters import FilterParams, ListQuery
+from export import export_table
+from database import ReadSessionLocal, get_read_db, get_write_db
+from responses import json_response
+from row_counts import get_total
+from search import search_customers
+from singleflight import coalesced_get
+from statements import select_by_id
+from write_queue import group_commit_enabled, write_coordinator
 from models.Customer import (
     Customer as CustomerModel,
     CustomerCreate,
@@ -16,30 +28,88 @@ logger = logging.getLogger(__name__)
 from fastapi import Query
 
 
+# Export the whole table as NDJSON or CSV
+@router.get("/customers/export", status_code=200)
+async def export_customers(format: Literal["ndjson", "csv"] = Query("ndjson")):
+    return export_table(CustomerModel, format, "customers")
+
+
+# Full-text search over name, email, city and address, best matches first
+@router.get("/customers/search", response_model=dict, status_code=200)
+async def search_customers_route(
+    db: AsyncSession = Depends(get_read_db),
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None),  # next_cursor from the previous page
+):
+    try:
+        customers, next_cursor = await search_customers(db, q, limit, cursor)
+        return json_response(
+            {
+                "message": "Customers retrieved successfully",
+                "data": customers,
+                "limit": limit,
+                "next_cursor": next_cursor,
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching customers: {e}")
+        raise HTTPException(status_code=500, detail="Error searching customers.")
+
+
+# Whitelisted filters and sorts for the customer list; each is indexed
+customer_query = ListQuery(
+    CustomerModel,
+    filters={
+        "email": ("email", "eq"),
+        "last_name": ("last_name", "eq"),
+        "city": ("city", "eq"),
+        "country": ("country", "eq"),
+    },
+    sorts=("customer_id", "last_name", "city", "country"),
+    default_limit=10,
+    max_limit=100,
+)
+
+
 @router.get("/customers/", response_model={}, status_code=200)
 async def get_customers(
-    db: AsyncSession = Depends(get_db),
-    limit: int = Query(10, ge=1, le=100),
-    offset: int = Query(0, ge=0),  # Offset should be (pagenumber - 1 ) * limit
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    params: FilterParams = Depends(customer_query.params),
+    count: Literal["exact", "estimated", "none"] = Query("exact"),
+    fields: Optional[str] = Query(None),  # e.g. customer_id,email
 ):
     try:
-        # Query database with pagination
-        result = await db.execute(select(CustomerModel).offset(offset).limit(limit))
-        customers = result.scalars().all()
+        # Select only the requested columns; rows come back as plain tuples
+        customers, next_cursor = await customer_query.fetch(
+            db, params, select_fields(CustomerModel, fields)
+        )
 
         if not customers:
-            return []
+            return conditional_response(request, json_response([]))
+
+        # The table-wide counter does not apply to a filtered list
+        if params.filters and count != "none":
+            total = await customer_query.count(db, params)
+        else:
+            total = await get_total(db, CustomerModel, count)
 
-        # Convert to Pydantic models
+        # Rows are encoded directly by the response class
         response = {
             "message": "Customers retrieved successfully",
-            "data": [CustomerRead.model_validate(customer) for customer in customers],
-            "limit": limit,
-            "offset": offset,
-            "total": len(customers),
+            "data": customers,
+            "limit": params.limit,
+            "offset": params.offset,
+            "total": total,
+            "next_cursor": next_cursor,
         }
         logger.info(f"Fetched {len(customers)} customers")
-        return response
+        return conditional_response(request, json_response(response))
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the error and re-raise as HTTPException
         print(f"Error retrieving customers: {e}")
@@ -47,77 +117,104 @@ async def get_customers(
 
 
 @router.post("/customers/", response_model=CustomerRead, status_code=201)
-async def create_customer(customer: CustomerCreate, db: AsyncSession = Depends(get_db)):
+async def create_customer(
+    customer: CustomerCreate, db: AsyncSession = Depends(get_write_db)
+):
     try:
+        if group_commit_enabled("customers"):
+            values = customer.model_dump()
+            customer_id = await write_coordinator.insert(CustomerModel, values)
+            return json_response(
+                {"customer_id": customer_id, **values}, status_code=201
+            )
+
         new_customer = CustomerModel(**customer.dict())
         db.add(new_customer)
         await db.commit()
         await db.refresh(new_customer)
-        return CustomerRead.model_validate(new_customer)
+        return json_response(new_customer, status_code=201)
     except Exception as e:
         logger.error(f"Error creating customer: {e}")
         raise HTTPException(status_code=500, detail="Error creating customer.")
 
 
+# Create customers in bulk from a JSON array or an NDJSON stream
+@router.post("/customers/bulk", response_model=dict, status_code=200)
+async def create_customers_bulk(
+    request: Request, db: AsyncSession = Depends(get_write_db)
+):
+    try:
+        return json_response(
+            await bulk_insert(
+                db, request, CustomerModel, CustomerCreate, unique_field="email"
+            )
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk creating customers: {e}")
+        raise HTTPException(status_code=500, detail="Error creating customers.")
+
+
 # Remove customer
 @router.delete("/customers/{customer_id}/", response_model=dict, status_code=200)
-async def remove_customer(customer_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(CustomerModel).filter(CustomerModel.customer_id == customer_id)
+async def remove_customer(customer_id: int, db: AsyncSession = Depends(get_write_db)):
+    await delete_returning(
+        db,
+        CustomerModel,
+        CustomerModel.customer_id,
+        customer_id,
+        detail="Customer not found",
     )
-    customer = result.scalars().first()
-    if not customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
 
-    await db.delete(customer)
-    await db.commit()
-
-    # Verify if the customer was successfully removed
-    result = await db.execute(
-        select(CustomerModel).filter(CustomerModel.customer_id == customer_id)
+    return json_response(
+        {"message": f"Customer removed successfully with customer id {customer_id}"}
     )
-    removed_customer = result.scalars().first()
-    if removed_customer:
-        return {"message": f"Failed to remove customer with customer id {customer_id}"}
-
-    return {"message": f"Customer removed successfully with customer id {customer_id}"}
 
 
 # Update customer
 @router.put("/customers/{customer_id}/", response_model=dict, status_code=200)
 async def update_customer(
-    customer_id: int, customer: CustomerUpdate, db: AsyncSession = Depends(get_db)
+    customer_id: int, customer: CustomerUpdate, db: AsyncSession = Depends(get_write_db)
 ):
-    result = await db.execute(
-        select(CustomerModel).filter(CustomerModel.customer_id == customer_id)
+    db_customer = await update_returning(
+        db,
+        CustomerModel,
+        CustomerModel.customer_id,
+        customer_id,
+        customer.model_dump(),
+        detail="Customer not found",
     )
-    db_customer = result.scalars().first()
-    if not db_customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
-
-    for key, value in customer.model_dump().items():
-        setattr(db_customer, key, value)
 
-    await db.commit()
-    await db.refresh(db_customer)
-
-    # Convert SQLAlchemy model instance to Pydantic model instance
-    customer_read = CustomerRead.model_validate(db_customer)
-
-    return {
-        "message": f"Customer updated successfully with customer id {customer_id}",
-        "data": customer_read,
-    }
+    return json_response(
+        {
+            "message": f"Customer updated successfully with customer id {customer_id}",
+            "data": db_customer,
+        }
+    )
 
 
 # Get customer by id
 @router.get("/customers/{customer_id}/", response_model=CustomerRead, status_code=200)
-async def get_customer_by_id(customer_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(CustomerModel).filter(CustomerModel.customer_id == customer_id)
-    )
-    customer = result.scalars().first()
-    if not customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
-
-    return customer
+async def get_customer_by_id(
+    customer_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None),  # e.g. customer_id,email
+):
+    columns = select_fields(CustomerModel, fields)
+
+    # Concurrent identical requests share this lookup and its encoded body,
+    # and are answered 304 from its ETag. It serves every waiting caller, so
+    # it runs on a session of its own.
+    async def fetch():
+        async with ReadSessionLocal() as db:
+            result = await db.execute(
+                select_by_id(CustomerModel, columns), {"id": customer_id}
+            )
+            customer = result.first()
+        if not customer:
+            raise HTTPException(status_code=404, detail="Customer not found")
+
+        return tag_response(json_response(customer))
+
+    return await coalesced_get(request, fetch)
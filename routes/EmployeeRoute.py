@@ -1,53 +1,122 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
-from database import SessionLocal, AsyncSession, get_db
-from models.Employee import Employee, EmployeeCreate, EmployeeRead, EmployeeUpdate
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from bulk import bulk_insert
+from crud import delete_returning, update_returning
+from etag import conditional_response, tag_response
+from fields import select_fields
+from filters import FilterParams, ListQuery
+from export import export_table
+from database import AsyncSession, ReadSessionLocal, get_read_db, get_write_db
+from singleflight import coalesced_get
+from statements import select_by_id
+from responses import json_response
+from write_queue import group_commit_enabled, write_coordinator
+from models.Employee import Employee, EmployeeCreate, EmployeeUpdate
 
 router = APIRouter()
 
 
+# Whitelisted filters and sorts for the employee list; each is indexed
+employee_query = ListQuery(
+    Employee,
+    filters={
+        "position": ("position", "eq"),
+        "hire_date_from": ("hire_date", "ge"),
+        "hire_date_to": ("hire_date", "le"),
+        "salary_min": ("salary", "ge"),
+        "salary_max": ("salary", "le"),
+    },
+    sorts=("employee_id", "position", "hire_date", "salary"),
+)
+
+
 @router.get("/employees/", status_code=200, response_model=dict)
-async def get_employees(db: AsyncSession = Depends(get_db)):
+async def get_employees(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    params: FilterParams = Depends(employee_query.params),
+    fields: Optional[str] = Query(None),  # e.g. employee_id,last_name
+):
     try:
-        result = await db.execute(select(Employee))
-        employees = result.scalars().all()
-
-        # Convert SQLAlchemy model instances to Pydantic model instances
-        employees_data = [
-            EmployeeRead.model_validate(employee) for employee in employees
-        ]
-
-        return {
-            "message": "Employees retrieved successfully",
-            "data": employees_data,
-        }
+        employees, next_cursor = await employee_query.fetch(
+            db, params, select_fields(Employee, fields)
+        )
+
+        # Rows are encoded directly by the response class
+        return conditional_response(
+            request,
+            json_response(
+                {
+                    "message": "Employees retrieved successfully",
+                    "data": employees,
+                    "limit": params.limit,
+                    "next_cursor": next_cursor,
+                }
+            ),
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error retrieving employees: {str(e)}"
         )
 
 
-@router.get("/employees/{employee_id}", status_code=200, response_model=dict)
-async def get_employee(employee_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Employee).where(Employee.employee_id == employee_id)
-    )
-    employee = result.scalars().first()
+# Export the whole table as NDJSON or CSV
+@router.get("/employees/export", status_code=200)
+async def export_employees(format: Literal["ndjson", "csv"] = Query("ndjson")):
+    return export_table(Employee, format, "employees")
+
 
-    if not employee:
-        raise HTTPException(status_code=404, detail="Employee not found")
+@router.get("/employees/{employee_id}", status_code=200, response_model=dict)
+async def get_employee(
+    employee_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None),  # e.g. employee_id,last_name
+):
+    columns = select_fields(Employee, fields)
+
+    # Concurrent identical requests share this lookup and its encoded body,
+    # and are answered 304 from its ETag. It serves every waiting caller, so
+    # it runs on a session of its own.
+    async def fetch():
+        async with ReadSessionLocal() as db:
+            result = await db.execute(
+                select_by_id(Employee, columns), {"id": employee_id}
+            )
+            employee = result.first()
+
+        if not employee:
+            raise HTTPException(status_code=404, detail="Employee not found")
 
-    employee_data = EmployeeRead.model_validate(employee)
+        return tag_response(
+            json_response(
+                {
+                    "message": "Employee retrieved successfully",
+                    "data": employee,
+                }
+            )
+        )
 
-    return {
-        "message": "Employee retrieved successfully",
-        "data": employee_data,
-    }
+    return await coalesced_get(request, fetch)
 
 
 @router.post("/employees/", status_code=201, response_model=dict)
-async def create_employee(employee: EmployeeCreate, db: AsyncSession = Depends(get_db)):
+async def create_employee(
+    employee: EmployeeCreate, db: AsyncSession = Depends(get_write_db)
+):
     try:
+        if group_commit_enabled("employees"):
+            values = employee.model_dump()
+            employee_id = await write_coordinator.insert(Employee, values)
+            return json_response(
+                {
+                    "message": "Employee created successfully",
+                    "data": {"employee_id": employee_id, **values},
+                },
+                status_code=201,
+            )
+
         # Create a new Employee instance using the data from the EmployeeCreate Pydantic model
         new_employee = Employee(
             first_name=employee.first_name,
@@ -62,49 +131,63 @@ async def create_employee(employee: EmployeeCreate, db: AsyncSession = Depends(g
         await db.commit()
         await db.refresh(new_employee)
 
-        # Convert the new employee to a Pydantic model instance
-        employee_data = EmployeeRead.model_validate(new_employee)
-
-        return {
-            "message": "Employee created successfully",
-            "data": employee_data,
-        }
+        return json_response(
+            {
+                "message": "Employee created successfully",
+                "data": new_employee,
+            },
+            status_code=201,
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error creating employee: {str(e)}"
         )
 
 
-@router.put("/employees/{employee_id}", status_code=200, response_model=dict)
-async def update_employee(
-    employee_id: int, employee: EmployeeUpdate, db: AsyncSession = Depends(get_db)
+# Create employees in bulk from a JSON array or an NDJSON stream
+@router.post("/employees/bulk", status_code=200, response_model=dict)
+async def create_employees_bulk(
+    request: Request, db: AsyncSession = Depends(get_write_db)
 ):
     try:
-        result = await db.execute(
-            select(Employee).where(Employee.employee_id == employee_id)
+        return json_response(await bulk_insert(db, request, Employee, EmployeeCreate))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error creating employees: {str(e)}"
         )
-        existing_employee = result.scalars().first()
-
-        if not existing_employee:
-            raise HTTPException(status_code=404, detail="Employee not found")
 
-        # Update the existing employee with the new data
-        existing_employee.first_name = employee.first_name
-        existing_employee.last_name = employee.last_name
-        existing_employee.position = employee.position
-        existing_employee.hire_date = employee.hire_date
-        existing_employee.salary = employee.salary
 
-        await db.commit()
-        await db.refresh(existing_employee)
-
-        # Convert the updated employee to a Pydantic model instance
-        employee_data = EmployeeRead.model_validate(existing_employee)
+@router.put("/employees/{employee_id}", status_code=200, response_model=dict)
+async def update_employee(
+    employee_id: int, employee: EmployeeUpdate, db: AsyncSession = Depends(get_write_db)
+):
+    try:
+        # Update the existing employee with the new data in a single statement
+        existing_employee = await update_returning(
+            db,
+            Employee,
+            Employee.employee_id,
+            employee_id,
+            {
+                "first_name": employee.first_name,
+                "last_name": employee.last_name,
+                "position": employee.position,
+                "hire_date": employee.hire_date,
+                "salary": employee.salary,
+            },
+            detail="Employee not found",
+        )
 
-        return {
-            "message": "Employee updated successfully",
-            "data": employee_data,
-        }
+        return json_response(
+            {
+                "message": "Employee updated successfully",
+                "data": existing_employee,
+            }
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error updating employee: {str(e)}"
@@ -112,25 +195,15 @@ async def update_employee(
 
 
 @router.delete("/employees/{employee_id}", status_code=200, response_model=dict)
-async def remove_employee(employee_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Employee).where(Employee.employee_id == employee_id)
+async def remove_employee(employee_id: int, db: AsyncSession = Depends(get_write_db)):
+    await delete_returning(
+        db,
+        Employee,
+        Employee.employee_id,
+        employee_id,
+        detail="Employee not found",
     )
-    employee = result.scalars().first()
 
-    if not employee:
-        raise HTTPException(status_code=404, detail="Employee not found")
-
-    await db.delete(employee)
-    await db.commit()
-
-    # Verify if the employee was successfully removed
-    result = await db.execute(
-        select(Employee).where(Employee.employee_id == employee_id)
+    return json_response(
+        {"message": f"Employee removed successfully with employee id {employee_id}"}
     )
-    removed_employee = result.scalars().first()
-
-    if removed_employee:
-        return {"message": f"Failed to remove employee with employee id {employee_id}"}
-
-    return {"message": f"Employee removed successfully with employee id {employee_id}"}
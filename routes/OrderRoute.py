@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import Integer, bindparam, select
+from sqlalchemy.exc import OperationalError
+from database import AsyncSession, get_read_db, get_write_db
+from orders import order_items, place_order
+from statements import select_by_id
+from responses import json_response
+from models.Order import Order, OrderCreate
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Read on every order lookup, so built once
+_items_query = select(
+    order_items.c.product_id, order_items.c.quantity, order_items.c.price_per_unit
+).where(order_items.c.order_id == bindparam("order_id", type_=Integer))
+
+
+# Place an order: stock is checked and taken, and the total computed, in the
+# same transaction that records the order and its items
+@router.post("/orders", status_code=201, response_model=dict)
+async def create_order(order: OrderCreate, db: AsyncSession = Depends(get_write_db)):
+    try:
+        placed = await place_order(db, order)
+        return json_response(
+            {"message": "Order placed successfully", "data": placed}, status_code=201
+        )
+    except HTTPException:
+        raise
+    except OperationalError as e:
+        # The write lock stayed busy past busy_timeout; safe to retry
+        if "locked" in str(e):
+            logger.warning(f"Order not placed, database busy: {e}")
+            raise HTTPException(
+                status_code=503,
+                detail="Database busy, try again",
+                headers={"Retry-After": "1"},
+            )
+        raise HTTPException(status_code=500, detail=f"Error placing order: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error placing order: {str(e)}")
+
+
+@router.get("/orders/{order_id}", status_code=200, response_model=dict)
+async def get_order(order_id: int, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(select_by_id(Order), {"id": order_id})
+    order = result.first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    result = await db.execute(_items_query, {"order_id": order_id})
+    return json_response(
+        {
+            "message": "Order retrieved successfully",
+            "data": {**order._asdict(), "items": result.all()},
+        }
+    )
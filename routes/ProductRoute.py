@@ -0,0 +1,153 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from crud import delete_returning, update_returning
+from etag import conditional_response, tag_response
+from fields import select_fields
+from filters import FilterParams, ListQuery
+from database import AsyncSession, ReadSessionLocal, get_read_db, get_write_db
+from singleflight import coalesced_get
+from statements import select_by_id
+from responses import json_response
+from models.Product import Product, ProductCreate, ProductUpdate
+
+router = APIRouter()
+
+
+# Whitelisted filters and sorts for the product list; each is indexed
+product_query = ListQuery(
+    Product,
+    filters={
+        "category_id": ("category_id", "eq"),
+        "price_min": ("price", "ge"),
+        "price_max": ("price", "le"),
+    },
+    sorts=("product_id", "category_id", "price"),
+)
+
+
+@router.get("/products/", status_code=200, response_model=dict)
+async def get_products(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    params: FilterParams = Depends(product_query.params),
+    fields: Optional[str] = Query(None),  # e.g. product_id,price
+):
+    try:
+        products, next_cursor = await product_query.fetch(
+            db, params, select_fields(Product, fields)
+        )
+
+        return conditional_response(
+            request,
+            json_response(
+                {
+                    "message": "Products retrieved successfully",
+                    "data": products,
+                    "limit": params.limit,
+                    "next_cursor": next_cursor,
+                }
+            ),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error retrieving products: {str(e)}"
+        )
+
+
+@router.get("/products/{product_id}", status_code=200, response_model=dict)
+async def get_product(
+    product_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None),  # e.g. product_id,stock_quantity
+):
+    columns = select_fields(Product, fields)
+
+    # Concurrent identical requests share this lookup and its encoded body,
+    # and are answered 304 from its ETag. It serves every waiting caller, so
+    # it runs on a session of its own.
+    async def fetch():
+        async with ReadSessionLocal() as db:
+            result = await db.execute(
+                select_by_id(Product, columns), {"id": product_id}
+            )
+            product = result.first()
+
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        return tag_response(
+            json_response(
+                {
+                    "message": "Product retrieved successfully",
+                    "data": product,
+                }
+            )
+        )
+
+    return await coalesced_get(request, fetch)
+
+
+@router.post("/products/", status_code=201, response_model=dict)
+async def create_product(
+    product: ProductCreate, db: AsyncSession = Depends(get_write_db)
+):
+    try:
+        new_product = Product(**product.model_dump())
+
+        db.add(new_product)
+        await db.commit()
+        await db.refresh(new_product)
+
+        return json_response(
+            {
+                "message": "Product created successfully",
+                "data": new_product,
+            },
+            status_code=201,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating product: {str(e)}")
+
+
+@router.put("/products/{product_id}", status_code=200, response_model=dict)
+async def update_product(
+    product_id: int, product: ProductUpdate, db: AsyncSession = Depends(get_write_db)
+):
+    try:
+        # Update the existing product with the new data in a single statement
+        existing_product = await update_returning(
+            db,
+            Product,
+            Product.product_id,
+            product_id,
+            product.model_dump(),
+            detail="Product not found",
+        )
+
+        return json_response(
+            {
+                "message": "Product updated successfully",
+                "data": existing_product,
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating product: {str(e)}")
+
+
+@router.delete("/products/{product_id}", status_code=200, response_model=dict)
+async def remove_product(product_id: int, db: AsyncSession = Depends(get_write_db)):
+    await delete_returning(
+        db,
+        Product,
+        Product.product_id,
+        product_id,
+        detail="Product not found",
+    )
+
+    return json_response(
+        {"message": f"Product removed successfully with product id {product_id}"}
+    )
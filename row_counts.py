@@ -0,0 +1,75 @@
+from sqlalchemy import Column, Integer, String, Table, bindparam, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import Base
+
+# Tables whose row count is kept up to date by triggers
+COUNTED_TABLES = ("customers", "employees", "categories")
+
+# One row per counted table, maintained by the triggers below so that list
+# endpoints can report a real total without a SELECT COUNT(*) scan.
+row_counts = Table(
+    "row_counts",
+    Base.metadata,
+    Column("table_name", String(50), primary_key=True),
+    Column("row_count", Integer, nullable=False, default=0),
+)
+
+
+# Install the counting triggers and seed missing counters. Runs inside the
+# same transaction as create_all, so no insert can slip between the seed
+# COUNT(*) and the trigger taking over.
+def install_row_counters(connection):
+    existing = set(
+        name.lower()
+        for (name,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    )
+    for table in COUNTED_TABLES:
+        if table not in existing:
+            continue
+        connection.exec_driver_sql(
+            f"INSERT OR IGNORE INTO row_counts (table_name, row_count) "
+            f"SELECT '{table}', COUNT(*) FROM {table}"
+        )
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_count_insert "
+            f"AFTER INSERT ON {table} BEGIN "
+            f"UPDATE row_counts SET row_count = row_count + 1 "
+            f"WHERE table_name = '{table}'; END"
+        )
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_count_delete "
+            f"AFTER DELETE ON {table} BEGIN "
+            f"UPDATE row_counts SET row_count = row_count - 1 "
+            f"WHERE table_name = '{table}'; END"
+        )
+
+
+# Read on every counted list request, so built once
+_count_query = select(row_counts.c.row_count).where(
+    row_counts.c.table_name == bindparam("table")
+)
+
+
+# Resolve the total for a list response.
+#   exact     - trigger-maintained counter, a single primary key lookup
+#   estimated - highest primary key, one index seek; over-counts after deletes
+#   none      - skip counting entirely
+async def get_total(db: AsyncSession, model, mode: str):
+    if mode == "none":
+        return None
+
+    if mode == "estimated":
+        pk = model.__table__.primary_key.columns.values()[0]
+        result = await db.execute(select(func.max(pk)))
+        return result.scalar() or 0
+
+    table = model.__tablename__
+    result = await db.execute(_count_query, {"table": table})
+    total = result.scalar()
+    if total is None:
+        # Counters not installed yet (e.g. startup hook skipped); fall back
+        result = await db.execute(select(func.count()).select_from(model))
+        total = result.scalar()
+    return total
@@ -0,0 +1,101 @@
+import re
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from pagination import decode_cursor, encode_cursor
+
+# Customer columns indexed for full-text search
+SEARCH_COLUMNS = ("first_name", "last_name", "email", "city", "address")
+
+
+# Create the customers_fts FTS5 index (external content, so the text is not
+# stored twice) and the triggers keeping it in step with the customers table.
+# A freshly created index is filled from the existing rows once.
+def install_customer_search(connection):
+    tables = set(
+        name.lower()
+        for (name,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    )
+    if "customers" not in tables:
+        return
+
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+
+    connection.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5("
+        f"{columns}, content='customers', content_rowid='customer_id')"
+    )
+    insert_new = (
+        f"INSERT INTO customers_fts (rowid, {columns}) "
+        f"VALUES (new.customer_id, {new_values});"
+    )
+    delete_old = (
+        f"INSERT INTO customers_fts (customers_fts, rowid, {columns}) "
+        f"VALUES ('delete', old.customer_id, {old_values});"
+    )
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS customers_fts_insert "
+        f"AFTER INSERT ON customers BEGIN {insert_new} END"
+    )
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS customers_fts_delete "
+        f"AFTER DELETE ON customers BEGIN {delete_old} END"
+    )
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS customers_fts_update "
+        f"AFTER UPDATE ON customers BEGIN {delete_old} {insert_new} END"
+    )
+
+    if "customers_fts" not in tables:
+        connection.exec_driver_sql(
+            "INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')"
+        )
+
+
+# Turn free text into an FTS5 query: every word must match, each as a
+# prefix. Words are quoted, so FTS5 operators in the input are inert.
+def build_match_query(q: str):
+    terms = re.findall(r"\w+", q)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+# Rank matches with bm25 and page through them by (rank, rowid), so later
+# pages seek instead of re-reading skipped hits.
+async def search_customers(db: AsyncSession, q: str, limit: int, cursor=None):
+    match = build_match_query(q)
+    if not match:
+        return [], None
+
+    params = {"match": match, "limit": limit + 1}
+    seek = ""
+    if cursor is not None:
+        try:
+            params["rank"], params["after"] = decode_cursor(cursor)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+        seek = "AND (customers_fts.rank, customers_fts.rowid) > (:rank, :after)"
+
+    result = await db.execute(
+        text(
+            f"SELECT customers.*, customers_fts.rank AS rank "
+            f"FROM customers_fts "
+            f"JOIN customers ON customers.customer_id = customers_fts.rowid "
+            f"WHERE customers_fts MATCH :match {seek} "
+            f"ORDER BY customers_fts.rank, customers_fts.rowid "
+            f"LIMIT :limit"
+        ),
+        params,
+    )
+    rows = result.mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]["rank"], rows[-1]["customer_id"]])
+    return [
+        {key: value for key, value in row.items() if key != "rank"} for row in rows
+    ], next_cursor
@@ -0,0 +1,46 @@
+import asyncio
+from fastapi import Request, Response
+from etag import not_modified
+from metrics import cache_requests
+
+
+# Coalesces identical concurrent GETs: the first request for a given path and
+# query runs the handler, every request arriving while it is in flight waits
+# for the same result, so a thundering herd costs one DB query and one
+# encoding. The shared work runs as its own task, so a caller going away does
+# not cancel it for the others.
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+
+    async def do(self, key, fetch):
+        task = self._inflight.get(key)
+        if task is not None:
+            cache_requests.inc(("singleflight", "hit"))
+        else:
+            cache_requests.inc(("singleflight", "miss"))
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+
+single_flight = SingleFlight()
+
+
+# Run fetch (which must build the full, unconditional response) through the
+# single-flight group, then answer this caller: a 304 when its If-None-Match
+# matches the shared ETag, otherwise its own copy of the encoded body. fetch
+# serves every waiting request, so it must open its own session rather than
+# use the first caller's.
+async def coalesced_get(request: Request, fetch) -> Response:
+    key = (request.url.path, request.url.query)
+    shared = await single_flight.do(key, fetch)
+    cached = not_modified(request, shared.headers.get("etag"))
+    if cached:
+        return cached
+    return Response(
+        content=shared.body,
+        status_code=shared.status_code,
+        headers=dict(shared.headers),
+    )
@@ -0,0 +1,106 @@
+from sqlalchemy import bindparam, delete, event, select, update
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+
+# Hot per-id statements, built once per model (and column selection) with the
+# key as a bind parameter. Reusing the same statement object skips rebuilding
+# it and lets SQLAlchemy reuse its memoized cache key and compiled SQL, and
+# the identical SQL text hits the driver's prepared statement cache.
+_statements = {}
+
+# Upper bound on cached statements (sparse fieldsets multiply the shapes)
+MAX_CACHED_STATEMENTS = 512
+
+
+def _cached(key, build):
+    statement = _statements.get(key)
+    if statement is None:
+        if len(_statements) >= MAX_CACHED_STATEMENTS:
+            _statements.clear()
+        statement = _statements[key] = build()
+    return statement
+
+
+def _primary_key(table):
+    return table.primary_key.columns.values()[0]
+
+
+# SELECT <columns> WHERE pk = :id
+def select_by_id(model, columns=None):
+    table = model.__table__
+    columns = list(table.c) if columns is None else columns
+    return _cached(
+        ("select", table.name, tuple(column.name for column in columns)),
+        lambda: select(*columns).where(
+            _primary_key(table) == bindparam("id", type_=_primary_key(table).type)
+        ),
+    )
+
+
+# UPDATE ... SET <keys> WHERE pk = :id RETURNING *; values are bound as
+# :value_<key>
+def update_by_id(model, keys):
+    table = model.__table__
+    return _cached(
+        ("update", table.name, tuple(keys)),
+        lambda: update(table)
+        .where(_primary_key(table) == bindparam("id", type_=_primary_key(table).type))
+        .values(
+            {key: bindparam(f"value_{key}", type_=table.c[key].type) for key in keys}
+        )
+        .returning(*table.c),
+    )
+
+
+def update_params(key, values: dict):
+    return {"id": key, **{f"value_{name}": value for name, value in values.items()}}
+
+
+# DELETE ... WHERE pk = :id RETURNING *
+def delete_by_id(model):
+    table = model.__table__
+    return _cached(
+        ("delete", table.name),
+        lambda: delete(table)
+        .where(_primary_key(table) == bindparam("id", type_=_primary_key(table).type))
+        .returning(*table.c),
+    )
+
+
+# Hit rate of SQLAlchemy's compiled statement cache, counted per statement
+# execution. Statements that are not cacheable (raw driver SQL, DDL) are
+# counted separately and left out of the rate.
+class CompiledCacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        cache_hit = getattr(context, "cache_hit", None)
+        if cache_hit is CACHE_HIT:
+            self.hits += 1
+        elif cache_hit is CACHE_MISS:
+            self.misses += 1
+        else:
+            self.uncached += 1
+
+    def track(self, engine):
+        sync_engine = engine.sync_engine
+        if not event.contains(sync_engine, "before_cursor_execute", self.record):
+            event.listen(sync_engine, "before_cursor_execute", self.record)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+    def snapshot(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncached": self.uncached,
+            "hit_rate": self.hit_rate,
+        }
+
+
+compiled_cache_stats = CompiledCacheStats()
@@ -1,10 +1,208 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
 import pytest
-from httpx import AsyncClient
+from httpx import ASGITransport, AsyncClient
 from typing import AsyncGenerator
-from main import app
+from sqlalchemy import event
+
+# Isolated test databases. The engines are created when the app is imported,
+# so before that DATABASE_URL is pointed at a per-worker temp file. Once per
+# session the schema, counters and triggers are installed there and the rows
+# the tests rely on are seeded; the result is kept as an in-memory template,
+# and each test starts from a fresh copy of it made with the SQLite backup
+# API. The configured database (./touch.db by default) is never read.
+_worker = os.getenv("PYTEST_XDIST_WORKER", "main")
+_directory = tempfile.mkdtemp(prefix="touch-tests-")
+test_database = os.path.join(_directory, f"{_worker}.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{test_database}"
+
+import database  # noqa: E402
+from main import app, init_db  # noqa: E402
+
+# Rows every test can count on: at least three of each listed resource, and
+# category 1 for the products the tests create
+SEED_ROWS = {
+    "customers": [
+        {
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": f"{first_name.lower()}.{last_name.lower()}@example.com",
+            "phone": phone,
+            "address": address,
+            "city": city,
+            "country": "USA",
+        }
+        for first_name, last_name, phone, address, city in (
+            ("John", "Doe", "555-1234", "123 Elm St.", "Springfield"),
+            ("Jane", "Smith", "555-5678", "456 Oak St.", "Greenville"),
+            ("Emily", "Johnson", "555-8765", "789 Pine St.", "Fairview"),
+        )
+    ],
+    "employees": [
+        {
+            "first_name": "Alice",
+            "last_name": "Brown",
+            "position": "Manager",
+            "hire_date": "2022-01-15",
+            "salary": 60000,
+        },
+        {
+            "first_name": "Bob",
+            "last_name": "Davis",
+            "position": "Salesperson",
+            "hire_date": "2023-03-10",
+            "salary": 40000,
+        },
+        {
+            "first_name": "Carol",
+            "last_name": "Evans",
+            "position": "Clerk",
+            "hire_date": "2024-06-01",
+            "salary": 35000,
+        },
+    ],
+    "categories": [
+        {"category_name": "Electronics", "description": "Electronic gadgets"},
+        {"category_name": "Clothing", "description": "Apparel"},
+        {"category_name": "Furniture", "description": "Home and office furniture"},
+        {"category_name": "Books", "description": "Printed and digital books"},
+    ],
+}
+
+
+async def _build_schema():
+    await init_db()
+    await database.engine.dispose()
+    await database.read_engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def template():
+    asyncio.run(_build_schema())
+    template = sqlite3.connect(":memory:", check_same_thread=False)
+    built = sqlite3.connect(test_database)
+    try:
+        with built:
+            for table, rows in SEED_ROWS.items():
+                columns = ", ".join(rows[0])
+                values = ", ".join(f":{column}" for column in rows[0])
+                built.executemany(
+                    f"INSERT INTO {table} ({columns}) VALUES ({values})", rows
+                )
+        built.backup(template)
+    finally:
+        built.close()
+    yield template
+    template.close()
+
+
+# Runs in every process, including an xdist controller that never uses its
+# directory
+def pytest_unconfigure(config):
+    shutil.rmtree(_directory, ignore_errors=True)
+
+
+# Reset the worker's database to the template; engines must be idle
+def restore_database(template):
+    target = sqlite3.connect(test_database)
+    try:
+        template.backup(target)
+    finally:
+        target.close()
+
+
+# Latency budgets are checked by default, except under xdist where workers
+# compete for the same cores; PERF_BUDGETS=0 turns them off. Statement
+# budgets always apply. PERF_BUDGET_FACTOR scales the latencies for slower
+# machines.
+LATENCY_BUDGETS = os.getenv("PERF_BUDGETS", "1") != "0" and _worker == "main"
+PERF_BUDGET_FACTOR = float(os.getenv("PERF_BUDGET_FACTOR", "1"))
+
+
+@pytest.fixture
+async def async_client(template) -> AsyncGenerator[AsyncClient, None]:
+    restore_database(template)
+    # Run the lifespan so background tasks run as in production; it disposes
+    # the engines again on exit
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            yield ac
+
+
+# Record the SQL run on the writer and reader engines inside the block
+@contextmanager
+def count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = {database.engine.sync_engine, database.read_engine.sync_engine}
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", record)
+
+
+# Asserts a request's SQL statement count and, when latency budgets are
+# enabled, its median wall time. The request runs once untimed to warm
+# caches, then `repeat` times measured; every run must issue exactly
+# `statements` statements.
+class RequestBudget:
+    def __init__(self, client: AsyncClient):
+        self.client = client
+
+    async def check(
+        self,
+        method: str,
+        url: str,
+        statements: int = None,
+        median_ms: float = None,
+        repeat: int = 5,
+        **kwargs,
+    ):
+        responses = [await self.client.request(method, url, **kwargs)]
+        timings = []
+        for _ in range(repeat):
+            with count_statements() as executed:
+                started = time.perf_counter()
+                response = await self.client.request(method, url, **kwargs)
+                timings.append((time.perf_counter() - started) * 1000)
+            responses.append(response)
+            assert response.status_code < 400, response.text
+            if statements is not None:
+                listed = "\n".join(executed)
+                assert len(executed) == statements, (
+                    f"{method} {url} issued {len(executed)} statements, "
+                    f"budget is {statements}:\n{listed}"
+                )
+
+        if LATENCY_BUDGETS and median_ms is not None and timings:
+            median = statistics.median(timings)
+            assert median <= median_ms * PERF_BUDGET_FACTOR, (
+                f"{method} {url} median {median:.2f} ms, "
+                f"budget is {median_ms * PERF_BUDGET_FACTOR:.2f} ms"
+            )
+        return responses
+
+
+# For one-off requests (e.g. a delete) that cannot be repeated
+@pytest.fixture
+def statement_counter():
+    return count_statements
 
 
 @pytest.fixture
-async def async_client() -> AsyncGenerator[AsyncClient, None]:
-    async with AsyncClient(app=app, base_url="http://test") as ac:
-        yield ac
+def request_budget(async_client: AsyncClient) -> RequestBudget:
+    return RequestBudget(async_client)
@@ -0,0 +1,70 @@
+import logging
+from httpx import AsyncClient
+import pytest
+from query_log import normalize, query_log
+from routes import AdminRoute
+
+HEADERS = {"X-Admin-Token": "test-token"}
+
+
+def test_normalize():
+    assert normalize("SELECT * FROM t WHERE a = 'x''y' AND b IN (?, ?,  ?)") == (
+        "SELECT * FROM t WHERE a = ? AND b IN (?, ...)"
+    )
+
+
+@pytest.mark.asyncio
+# slow statements are logged with their plan and listed by the admin route
+async def test_slow_queries(async_client: AsyncClient, monkeypatch, caplog):
+    monkeypatch.setattr(query_log, "threshold", 0)
+    monkeypatch.setattr(query_log, "scan_rows", 0)
+    monkeypatch.setattr(AdminRoute, "ADMIN_TOKEN", HEADERS["X-Admin-Token"])
+    await async_client.delete("/api/v1/admin/slow-queries", headers=HEADERS)
+
+    with caplog.at_level(logging.WARNING, logger="query_log"):
+        response = await async_client.get(
+            "/api/v1/employees/", params={"salary_min": 1, "order_by": "-position"}
+        )
+    assert response.status_code == 200
+    assert any("Slow query" in record.message for record in caplog.records)
+
+    response = await async_client.get(
+        "/api/v1/admin/slow-queries",
+        params={"order": "max", "limit": 100},
+        headers=HEADERS,
+    )
+    statements = response.json()["statements"]
+    listed = [s for s in statements if "FROM employees" in s["statement"]]
+    assert listed and listed[0]["plan"]
+    assert all(s["calls"] >= s["slow_calls"] >= 1 for s in listed)
+
+    # an unfiltered listing walks the table, flagged once it counts as large
+    response = await async_client.get(
+        "/api/v1/customers/", params={"order_by": "-customer_id", "limit": 1}
+    )
+    statements = (
+        await async_client.get(
+            "/api/v1/admin/slow-queries", params={"limit": 100}, headers=HEADERS
+        )
+    ).json()
+    assert any("customers" in s["scans"] for s in statements["statements"])
+
+
+@pytest.mark.asyncio
+# admin routes are closed without a configured token, and to wrong tokens
+async def test_admin_token(async_client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(AdminRoute, "ADMIN_TOKEN", None)
+    response = await async_client.get("/api/v1/admin/slow-queries", headers=HEADERS)
+    assert response.status_code == 403
+    response = await async_client.delete("/api/v1/admin/slow-queries")
+    assert response.status_code == 403
+
+    monkeypatch.setattr(AdminRoute, "ADMIN_TOKEN", HEADERS["X-Admin-Token"])
+    response = await async_client.get("/api/v1/admin/slow-queries")
+    assert response.status_code == 403
+    response = await async_client.get(
+        "/api/v1/admin/slow-queries", headers={"X-Admin-Token": "wrong"}
+    )
+    assert response.status_code == 403
+    response = await async_client.get("/api/v1/admin/slow-queries", headers=HEADERS)
+    assert response.status_code == 200
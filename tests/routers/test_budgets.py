@@ -0,0 +1,70 @@
+from httpx import AsyncClient
+import pytest
+
+# Statement and median latency budgets per route. Statement counts are
+# checked on every run, so a stray verify SELECT or refresh round trip fails
+# the suite; latencies too, unless PERF_BUDGETS=0 or under xdist. ETags are
+# hashed from the body, so reads cost one query (the customers list adds its
+# total); categories are served from the process cache once warm.
+READ_BUDGETS = [
+    ("/api/v1/customers/{customer_id}/", 1, 25),
+    ("/api/v1/customers/", 2, 25),
+    ("/api/v1/customers/search?q=a", 1, 25),
+    ("/api/v1/employees/{employee_id}", 1, 25),
+    ("/api/v1/employees/", 1, 25),
+    ("/api/v1/categories/", 0, 25),
+    ("/api/v1/categories/{category_id}", 0, 25),
+]
+
+
+async def first_ids(async_client: AsyncClient):
+    customers = await async_client.get("/api/v1/customers/")
+    employees = await async_client.get("/api/v1/employees/")
+    categories = await async_client.get("/api/v1/categories/")
+    return {
+        "customer_id": customers.json()["data"][0]["customer_id"],
+        "employee_id": employees.json()["data"][0]["employee_id"],
+        "category_id": categories.json()[0]["category_id"],
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url, statements, median_ms", READ_BUDGETS)
+async def test_read_budgets(
+    async_client: AsyncClient, request_budget, url, statements, median_ms
+):
+    ids = await first_ids(async_client)
+    await request_budget.check(
+        "GET", url.format(**ids), statements=statements, median_ms=median_ms
+    )
+
+
+@pytest.mark.asyncio
+# INSERT plus the refresh SELECT; update and delete are one RETURNING each
+async def test_employee_write_budgets(
+    async_client: AsyncClient, request_budget, statement_counter
+):
+    payload = {
+        "first_name": "Budget",
+        "last_name": "Check",
+        "position": "Clerk",
+        "hire_date": "2021-01-01",
+        "salary": 4000,
+    }
+    created = await request_budget.check(
+        "POST", "/api/v1/employees/", statements=2, median_ms=50, json=payload
+    )
+    ids = [response.json()["data"]["employee_id"] for response in created]
+
+    await request_budget.check(
+        "PUT",
+        f"/api/v1/employees/{ids[0]}",
+        statements=1,
+        median_ms=50,
+        json=payload,
+    )
+    for employee_id in ids:
+        with statement_counter() as executed:
+            response = await async_client.delete(f"/api/v1/employees/{employee_id}")
+        assert response.status_code == 200
+        assert len(executed) == 1
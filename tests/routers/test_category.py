@@ -0,0 +1,212 @@
+import asyncio
+import sqlite3
+import uuid
+from httpx import AsyncClient
+import pytest
+from sqlalchemy import make_url
+import database
+import write_queue
+from invalidation import ChangeWatcher, change_watcher
+from routes.CategoryRoute import category_cache
+
+
+@pytest.mark.asyncio
+# update rejects duplicate names and unknown ids, delete reports 404 once gone
+async def test_update_and_delete_category(async_client: AsyncClient):
+    first = f"Category {uuid.uuid4().hex}"
+    second = f"Category {uuid.uuid4().hex}"
+    response = await async_client.post(
+        "/api/v1/categories/", json={"category_name": first}
+    )
+    assert response.status_code == 201
+    first_id = response.json()["category_id"]
+    response = await async_client.post(
+        "/api/v1/categories/", json={"category_name": second}
+    )
+    second_id = response.json()["category_id"]
+
+    response = await async_client.put(
+        f"/api/v1/categories/{first_id}",
+        json={"category_id": first_id, "category_name": second},
+    )
+    assert response.status_code == 400
+
+    response = await async_client.put(
+        f"/api/v1/categories/{first_id}",
+        json={"category_id": first_id, "category_name": first, "description": "x"},
+    )
+    assert response.status_code == 200
+    assert response.json()["description"] == "x"
+
+    for category_id in (first_id, second_id):
+        response = await async_client.delete(f"/api/v1/categories/{category_id}")
+        assert response.status_code == 200
+
+    response = await async_client.delete(f"/api/v1/categories/{first_id}")
+    assert response.status_code == 404
+
+    response = await async_client.put(
+        f"/api/v1/categories/{first_id}",
+        json={"category_id": first_id, "category_name": first},
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+# cached categories pick up writes made outside this process
+async def test_category_cache_sees_foreign_writes(async_client: AsyncClient):
+    response = await async_client.get("/api/v1/categories/")
+    assert response.status_code == 200
+
+    name = f"Foreign {uuid.uuid4().hex}"
+    with sqlite3.connect(make_url(database.database_url).database) as conn:
+        category_id = conn.execute(
+            "INSERT INTO categories (category_name) VALUES (?)", (name,)
+        ).lastrowid
+
+    change_watcher.poll(force=True)
+    response = await async_client.get(f"/api/v1/categories/{category_id}")
+    assert response.status_code == 200
+    assert response.json()["category_name"] == name
+
+    response = await async_client.delete(f"/api/v1/categories/{category_id}")
+    response = await async_client.get(f"/api/v1/categories/{category_id}")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+# writes to other tables leave the categories cache alone
+async def test_category_cache_ignores_other_tables(async_client: AsyncClient):
+    await async_client.get("/api/v1/categories/")
+    change_watcher.poll(force=True)
+    await async_client.get("/api/v1/categories/")
+    snapshot = category_cache._snapshot
+    assert snapshot is not None
+
+    with sqlite3.connect(make_url(database.database_url).database) as conn:
+        conn.execute(
+            "INSERT INTO employees (first_name, last_name) VALUES ('Other', 'Table')"
+        )
+        conn.execute("DELETE FROM employees WHERE last_name = 'Table'")
+
+    change_watcher.poll(force=True)
+    assert category_cache._snapshot is snapshot
+
+
+@pytest.mark.asyncio
+# a failing poll keeps subscribers' caches and backs off until it recovers
+async def test_change_watcher_backs_off(tmp_path):
+    path = tmp_path / "watched.db"
+    sqlite3.connect(path).close()
+    watcher = ChangeWatcher(f"sqlite:///{path}", interval=0.1, max_backoff=1)
+    dropped = []
+    watcher.subscribe("categories", lambda: dropped.append(1))
+
+    for _ in range(5):
+        watcher.poll(force=True)
+    assert dropped == []
+    assert watcher._delay() == 1
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE table_versions (table_name, version)")
+        conn.execute("INSERT INTO table_versions VALUES ('categories', 1)")
+    watcher.poll(force=True)
+    assert dropped == [1]
+    assert watcher._delay() == 0.1
+
+    watcher.poll()
+    watcher.poll(force=True)
+    assert dropped == [1]
+    await watcher.stop()
+
+
+@pytest.mark.asyncio
+# the categories list ETag comes from the cached snapshot
+async def test_get_categories_etag(async_client: AsyncClient):
+    response = await async_client.get("/api/v1/categories/")
+    etag = response.headers["etag"]
+
+    response = await async_client.get(
+        "/api/v1/categories/", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    response = await async_client.post(
+        "/api/v1/categories/", json={"category_name": f"Etag {uuid.uuid4().hex}"}
+    )
+    category_id = response.json()["category_id"]
+    response = await async_client.get(
+        "/api/v1/categories/", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    await async_client.delete(f"/api/v1/categories/{category_id}")
+
+
+@pytest.mark.asyncio
+# sparse fieldsets on the cached categories
+async def test_get_categories_fields(async_client: AsyncClient):
+    response = await async_client.get(
+        "/api/v1/categories/", params={"fields": "category_name"}
+    )
+    assert response.status_code == 200
+    for category in response.json():
+        assert set(category) == {"category_id", "category_name"}
+
+
+@pytest.mark.asyncio
+# paged category listings skip the cache and link the next page
+async def test_get_categories_paged(async_client: AsyncClient):
+    cached = (await async_client.get("/api/v1/categories/")).json()
+
+    seen, url = [], "/api/v1/categories/?limit=1&order_by=-category_id"
+    while url:
+        response = await async_client.get(url)
+        assert response.status_code == 200
+        seen += response.json()
+        url = response.links.get("next", {}).get("url")
+    assert seen == sorted(cached, key=lambda row: -row["category_id"])
+
+    # the next link drops the offset it started from
+    response = await async_client.get(
+        "/api/v1/categories/", params={"limit": 1, "offset": 1}
+    )
+    assert response.json() == cached[1:2]
+    response = await async_client.get(response.links["next"]["url"])
+    assert response.status_code == 200
+    assert response.json() == cached[2:3]
+
+    name = cached[0]["category_name"]
+    response = await async_client.get(
+        "/api/v1/categories/", params={"category_name": name}
+    )
+    assert [row["category_name"] for row in response.json()] == [name]
+
+
+@pytest.mark.asyncio
+# group-committed creates release the writer and still reject duplicates
+async def test_create_categories_group_commit(async_client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(write_queue, "group_commit_routers", {"categories"})
+    names = [f"Group {uuid.uuid4().hex}" for _ in range(5)]
+
+    responses = await asyncio.wait_for(
+        asyncio.gather(
+            *[
+                async_client.post("/api/v1/categories/", json={"category_name": name})
+                for name in names
+            ]
+        ),
+        timeout=10,
+    )
+    assert all(response.status_code == 201 for response in responses)
+    ids = [response.json()["category_id"] for response in responses]
+    assert len(set(ids)) == len(ids)
+
+    response = await async_client.post(
+        "/api/v1/categories/", json={"category_name": names[0]}
+    )
+    assert response.status_code == 400
+
+    for category_id in ids:
+        response = await async_client.get(f"/api/v1/categories/{category_id}")
+        assert response.status_code == 200
+        await async_client.delete(f"/api/v1/categories/{category_id}")
@@ -1,5 +1,15 @@
+import asyncio
+import json
+import uuid
 from httpx import AsyncClient
 import pytest
+from sqlalchemy import event
+import database
+import export
+import write_queue
+from models.Customer import Customer
+from pagination import encode_cursor
+from statements import compiled_cache_stats, select_by_id
 
 
 @pytest.mark.asyncio
@@ -10,3 +20,458 @@ async def test_get_customers(async_client: AsyncClient):
     assert response.json() == {"customers": []}
 
     return response.json()
+
+
+@pytest.mark.asyncio
+# walk all customers with keyset cursors
+async def test_get_customers_cursor_pagination(async_client: AsyncClient):
+    response = await async_client.get("/api/v1/customers/", params={"limit": 1})
+    assert response.status_code == 200
+    body = response.json()
+    seen = [customer["customer_id"] for customer in body["data"]]
+
+    while body["next_cursor"]:
+        response = await async_client.get(
+            "/api/v1/customers/", params={"limit": 1, "cursor": body["next_cursor"]}
+        )
+        assert response.status_code == 200
+        body = response.json()
+        seen += [customer["customer_id"] for customer in body["data"]]
+
+    assert seen == sorted(set(seen))
+
+
+@pytest.mark.asyncio
+# cursors that wrap only the last id, as first issued, still page by id
+async def test_get_customers_legacy_cursor(async_client: AsyncClient):
+    response = await async_client.get("/api/v1/customers/", params={"limit": 2})
+    first, second = [row["customer_id"] for row in response.json()["data"]]
+
+    response = await async_client.get(
+        "/api/v1/customers/", params={"limit": 1, "cursor": encode_cursor(first)}
+    )
+    assert response.status_code == 200
+    assert [row["customer_id"] for row in response.json()["data"]] == [second]
+
+    response = await async_client.get(
+        "/api/v1/customers/",
+        params={"limit": 1, "cursor": encode_cursor(first), "order_by": "last_name"},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+# reject malformed cursors
+async def test_get_customers_invalid_cursor(async_client: AsyncClient):
+    response = await async_client.get(
+        "/api/v1/customers/", params={"cursor": "not-a-cursor"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+# total tracks inserts and deletes without scanning the table
+async def test_get_customers_total_count(async_client: AsyncClient):
+    response = await async_client.get("/api/v1/customers/", params={"limit": 1})
+    total = response.json()["total"]
+
+    response = await async_client.post(
+        "/api/v1/customers/",
+        json={
+            "first_name": "Count",
+            "last_name": "Check",
+            "email": f"count.{uuid.uuid4().hex}@example.com",
+            "phone": "555-0000",
+            "address": "1 Test St.",
+            "city": "Testville",
+            "country": "USA",
+        },
+    )
+    assert response.status_code == 201
+    customer_id = response.json()["customer_id"]
+
+    response = await async_client.get("/api/v1/customers/", params={"limit": 1})
+    assert response.json()["total"] == total + 1
+
+    await async_client.delete(f"/api/v1/customers/{customer_id}/")
+    response = await async_client.get("/api/v1/customers/", params={"limit": 1})
+    assert response.json()["total"] == total
+
+    response = await async_client.get(
+        "/api/v1/customers/", params={"limit": 1, "count": "none"}
+    )
+    assert response.json()["total"] is None
+
+
+@pytest.mark.asyncio
+# update and remove go through UPDATE/DELETE ... RETURNING
+async def test_update_and_remove_customer(async_client: AsyncClient):
+    payload = {
+        "first_name": "Write",
+        "last_name": "Path",
+        "email": f"write.{uuid.uuid4().hex}@example.com",
+        "phone": "555-0001",
+        "address": "2 Test St.",
+        "city": "Testville",
+        "country": "USA",
+    }
+    response = await async_client.post("/api/v1/customers/", json=payload)
+    customer_id = response.json()["customer_id"]
+
+    payload["city"] = "Elsewhere"
+    response = await async_client.put(f"/api/v1/customers/{customer_id}/", json=payload)
+    assert response.status_code == 200
+    assert response.json()["data"]["city"] == "Elsewhere"
+
+    response = await async_client.delete(f"/api/v1/customers/{customer_id}/")
+    assert response.status_code == 200
+
+    response = await async_client.delete(f"/api/v1/customers/{customer_id}/")
+    assert response.status_code == 404
+
+    response = await async_client.put(f"/api/v1/customers/{customer_id}/", json=payload)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+# concurrent creates share group commits and each get their own id
+async def test_create_customers_group_commit(async_client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(write_queue, "group_commit_routers", {"customers"})
+
+    def payload(n):
+        return {
+            "first_name": "Group",
+            "last_name": f"Commit {n}",
+            "email": f"group.{uuid.uuid4().hex}@example.com",
+            "phone": "555-0002",
+            "address": "3 Test St.",
+            "city": "Testville",
+            "country": "USA",
+        }
+
+    responses = await asyncio.gather(
+        *[async_client.post("/api/v1/customers/", json=payload(n)) for n in range(20)]
+    )
+    assert all(response.status_code == 201 for response in responses)
+    ids = [response.json()["customer_id"] for response in responses]
+    assert len(set(ids)) == len(ids)
+
+    for customer_id in ids:
+        response = await async_client.get(f"/api/v1/customers/{customer_id}/")
+        assert response.status_code == 200
+        await async_client.delete(f"/api/v1/customers/{customer_id}/")
+
+    # a duplicate email fails only its own request
+    duplicate = payload(0)
+    responses = await asyncio.gather(
+        async_client.post("/api/v1/customers/", json=duplicate),
+        async_client.post("/api/v1/customers/", json=duplicate),
+    )
+    assert sorted(response.status_code for response in responses) == [201, 500]
+
+
+@pytest.mark.asyncio
+# bulk create reports a result per row, including conflicts and bad rows
+async def test_create_customers_bulk(async_client: AsyncClient):
+    email = f"bulk.{uuid.uuid4().hex}@example.com"
+    row = {
+        "first_name": "Bulk",
+        "last_name": "Row",
+        "email": email,
+        "phone": "555-0003",
+        "address": "4 Test St.",
+        "city": "Testville",
+        "country": "USA",
+    }
+    other = dict(row, email=f"bulk.{uuid.uuid4().hex}@example.com")
+    response = await async_client.post(
+        "/api/v1/customers/bulk", json=[row, row, {"first_name": "Bad"}, other]
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["status"] for result in body["results"]] == [
+        "created",
+        "conflict",
+        "invalid",
+        "created",
+    ]
+    assert body["created"] == 2
+
+    # same rows as NDJSON: both emails now exist
+    ndjson = "\n".join(json.dumps(r) for r in (row, other))
+    response = await async_client.post(
+        "/api/v1/customers/bulk",
+        content=ndjson,
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert [result["status"] for result in response.json()["results"]] == [
+        "conflict",
+        "conflict",
+    ]
+
+    for result in body["results"]:
+        if result["status"] == "created":
+            await async_client.delete(f"/api/v1/customers/{result['customer_id']}/")
+
+
+@pytest.mark.asyncio
+# export streams every customer as NDJSON or CSV
+async def test_export_customers(async_client: AsyncClient, monkeypatch):
+    response = await async_client.get("/api/v1/customers/", params={"limit": 1})
+    total = response.json()["total"]
+
+    response = await async_client.get("/api/v1/customers/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == total
+    assert {"customer_id", "email", "address"} <= set(rows[0])
+
+    response = await async_client.get(
+        "/api/v1/customers/export", params={"format": "csv"}
+    )
+    lines = response.text.splitlines()
+    assert lines[0].startswith("customer_id,first_name")
+    assert len(lines) == total + 1
+
+    # batches continue after the last key sent, whatever the batch size
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    response = await async_client.get("/api/v1/customers/export")
+    ids = [json.loads(line)["customer_id"] for line in response.text.splitlines()]
+    assert ids == sorted(row["customer_id"] for row in rows)
+
+
+@pytest.mark.asyncio
+# conditional GET answers 304 until that customer changes
+async def test_get_customer_etag(async_client: AsyncClient):
+    response = await async_client.get("/api/v1/customers/", params={"limit": 1})
+    customer_id = response.json()["data"][0]["customer_id"]
+    url = f"/api/v1/customers/{customer_id}/"
+
+    response = await async_client.get(url)
+    etag = response.headers["etag"]
+    assert "must-revalidate" in response.headers["cache-control"]
+
+    response = await async_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = await async_client.get(
+        "/api/v1/customers/", params={"limit": 1}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+
+    response = await async_client.post(
+        "/api/v1/customers/bulk",
+        json=[
+            {
+                "first_name": "Etag",
+                "last_name": "Bump",
+                "email": f"etag.{uuid.uuid4().hex}@example.com",
+                "phone": "555-0004",
+                "address": "5 Test St.",
+                "city": "Testville",
+                "country": "USA",
+            }
+        ],
+    )
+    new_id = response.json()["results"][0]["customer_id"]
+    response = await async_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    await async_client.delete(f"/api/v1/customers/{new_id}/")
+
+    customer = (await async_client.get(url)).json()
+    customer.pop("customer_id")
+    response = await async_client.put(url, json=dict(customer, phone="555-0009"))
+    assert response.status_code == 200
+    response = await async_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+# identical concurrent reads share one query and one body
+async def test_get_customer_coalesced(async_client: AsyncClient):
+    response = await async_client.get("/api/v1/customers/", params={"limit": 1})
+    customer_id = response.json()["data"][0]["customer_id"]
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if "FROM customers" in statement:
+            statements.append(statement)
+
+    event.listen(database.read_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        responses = await asyncio.gather(
+            *[async_client.get(f"/api/v1/customers/{customer_id}/") for _ in range(20)]
+        )
+    finally:
+        event.remove(database.read_engine.sync_engine, "before_cursor_execute", count)
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.content for response in responses}) == 1
+    assert len(statements) < 20, statements
+
+
+@pytest.mark.asyncio
+# reads and revalidations alike cost the one lookup; a match sends no body
+async def test_get_customer_not_modified(async_client: AsyncClient, statement_counter):
+    response = await async_client.get("/api/v1/customers/", params={"limit": 1})
+    url = f"/api/v1/customers/{response.json()['data'][0]['customer_id']}/"
+
+    with statement_counter() as statements:
+        etag = (await async_client.get(url)).headers["etag"]
+        response = await async_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert len(statements) == 2, statements
+    assert all("FROM customers" in statement for statement in statements)
+
+
+@pytest.mark.asyncio
+# full-text search with prefix terms, kept in sync by triggers
+async def test_search_customers(async_client: AsyncClient):
+    marker = f"zq{uuid.uuid4().hex[:10]}"
+    ids = []
+    for n in range(3):
+        response = await async_client.post(
+            "/api/v1/customers/",
+            json={
+                "first_name": "Search",
+                "last_name": f"{marker}{n}",
+                "email": f"search.{uuid.uuid4().hex}@example.com",
+                "phone": "555-0005",
+                "address": f"{n} Quarry Lane",
+                "city": "Testville",
+                "country": "USA",
+            },
+        )
+        ids.append(response.json()["customer_id"])
+
+    seen, cursor = [], None
+    while True:
+        params = {"q": f"search {marker}", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await async_client.get("/api/v1/customers/search", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        seen += [customer["customer_id"] for customer in body["data"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(seen) == ids
+
+    await async_client.put(
+        f"/api/v1/customers/{ids[0]}/",
+        json={
+            "first_name": "Renamed",
+            "last_name": "Elsewhere",
+            "email": f"search.{uuid.uuid4().hex}@example.com",
+            "phone": "555-0005",
+            "address": "0 Quarry Lane",
+            "city": "Testville",
+            "country": "USA",
+        },
+    )
+    await async_client.delete(f"/api/v1/customers/{ids[1]}/")
+    response = await async_client.get("/api/v1/customers/search", params={"q": marker})
+    assert [customer["customer_id"] for customer in response.json()["data"]] == [ids[2]]
+    await async_client.delete(f"/api/v1/customers/{ids[0]}/")
+    await async_client.delete(f"/api/v1/customers/{ids[2]}/")
+
+
+@pytest.mark.asyncio
+# sparse fieldsets select only the requested columns
+async def test_get_customers_fields(async_client: AsyncClient):
+    response = await async_client.get(
+        "/api/v1/customers/", params={"limit": 2, "fields": "email"}
+    )
+    assert response.status_code == 200
+    for customer in response.json()["data"]:
+        assert set(customer) == {"customer_id", "email"}
+
+    customer_id = response.json()["data"][0]["customer_id"]
+    response = await async_client.get(
+        f"/api/v1/customers/{customer_id}/", params={"fields": "city,email"}
+    )
+    assert list(response.json()) == ["customer_id", "city", "email"]
+
+    response = await async_client.get(
+        "/api/v1/customers/", params={"fields": "email,password"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+# whitelisted filters and sorts page through the indexed columns
+async def test_get_customers_filtered(async_client: AsyncClient):
+    city = f"Filter {uuid.uuid4().hex}"
+    rows = [
+        {
+            "first_name": "Filter",
+            "last_name": f"Customer {n}",
+            "email": f"filter.{uuid.uuid4().hex}@example.com",
+            "phone": "555-0002",
+            "address": "3 Test St.",
+            "city": city,
+            "country": "USA",
+        }
+        for n in range(3)
+    ]
+    response = await async_client.post("/api/v1/customers/bulk", json=rows)
+    ids = [result["customer_id"] for result in response.json()["results"]]
+
+    seen, params = [], {"city": city, "order_by": "-last_name", "limit": 2}
+    while True:
+        response = await async_client.get("/api/v1/customers/", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 3
+        seen += [customer["customer_id"] for customer in body["data"]]
+        if not body["next_cursor"]:
+            break
+        params["cursor"] = body["next_cursor"]
+    assert seen == ids[::-1]
+
+    response = await async_client.get(
+        "/api/v1/customers/", params={"order_by": "phone"}
+    )
+    assert response.status_code == 422
+
+    for customer_id in ids:
+        await async_client.delete(f"/api/v1/customers/{customer_id}/")
+
+
+@pytest.mark.asyncio
+# per-id lookups reuse one prebuilt statement and hit the compiled cache
+async def test_get_customer_by_id_compiled_cache(async_client: AsyncClient):
+    response = await async_client.get("/api/v1/customers/", params={"limit": 1})
+    customer_id = response.json()["data"][0]["customer_id"]
+    assert select_by_id(Customer) is select_by_id(Customer)
+
+    await async_client.get(f"/api/v1/customers/{customer_id}/")
+    hits = compiled_cache_stats.hits
+    await async_client.get(f"/api/v1/customers/{customer_id}/")
+    assert compiled_cache_stats.hits >= hits + 1
+    assert 0 < compiled_cache_stats.hit_rate <= 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("run", ["first", "second"])
+# every test starts from the template, so the same unique email fits twice
+async def test_isolated_database(async_client: AsyncClient, run):
+    response = await async_client.post(
+        "/api/v1/customers/",
+        json={
+            "first_name": "Isolated",
+            "last_name": run,
+            "email": "isolated@example.com",
+            "phone": "555-0003",
+            "address": "4 Test St.",
+            "city": "Testville",
+            "country": "USA",
+        },
+    )
+    assert response.status_code == 201
@@ -0,0 +1,137 @@
+import json
+from httpx import AsyncClient
+import pytest
+from routes.EmployeeRoute import employee_query
+
+
+@pytest.mark.asyncio
+# update and remove go through UPDATE/DELETE ... RETURNING
+async def test_update_and_remove_employee(async_client: AsyncClient):
+    payload = {
+        "first_name": "Eve",
+        "last_name": "Writer",
+        "position": "Clerk",
+        "hire_date": "2024-01-02",
+        "salary": 30000,
+    }
+    response = await async_client.post("/api/v1/employees/", json=payload)
+    assert response.status_code == 201
+    employee_id = response.json()["data"]["employee_id"]
+
+    payload["salary"] = 35000.5
+    response = await async_client.put(f"/api/v1/employees/{employee_id}", json=payload)
+    assert response.status_code == 200
+    assert response.json()["data"]["salary"] == 35000.5
+    assert response.json()["data"]["hire_date"] == "2024-01-02"
+
+    response = await async_client.delete(f"/api/v1/employees/{employee_id}")
+    assert response.status_code == 200
+
+    response = await async_client.delete(f"/api/v1/employees/{employee_id}")
+    assert response.status_code == 404
+
+    response = await async_client.put(f"/api/v1/employees/{employee_id}", json=payload)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+# bulk create from an NDJSON stream
+async def test_create_employees_bulk_ndjson(async_client: AsyncClient):
+    rows = [
+        {
+            "first_name": f"Bulk{n}",
+            "last_name": "Employee",
+            "position": "Clerk",
+            "hire_date": "2024-02-03",
+            "salary": 1000 + n,
+        }
+        for n in range(3)
+    ]
+    response = await async_client.post(
+        "/api/v1/employees/bulk",
+        content="\n".join(json.dumps(row) for row in rows) + "\n",
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 3
+
+    for result in body["results"]:
+        response = await async_client.get(f"/api/v1/employees/{result['employee_id']}")
+        assert response.json()["data"]["first_name"].startswith("Bulk")
+        await async_client.delete(f"/api/v1/employees/{result['employee_id']}")
+
+
+@pytest.mark.asyncio
+# export is not swallowed by the /employees/{employee_id} route
+async def test_export_employees(async_client: AsyncClient):
+    response = await async_client.get("/api/v1/employees/export")
+    assert response.status_code == 200
+    for line in response.text.splitlines():
+        assert isinstance(json.loads(line)["salary"], float)
+
+
+async def walk_employees(async_client: AsyncClient, **params):
+    seen, cursor = [], None
+    while True:
+        if cursor:
+            params["cursor"] = cursor
+        response = await async_client.get("/api/v1/employees/", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        seen += body["data"]
+        cursor = body["next_cursor"]
+        if not cursor:
+            return seen
+
+
+@pytest.mark.asyncio
+# keyset pages over a nullable sort column match a single full page
+async def test_get_employees_sorted_pages(async_client: AsyncClient):
+    rows = [
+        {
+            "first_name": "Page",
+            "last_name": f"Employee {n}",
+            "position": [None, "Clerk", "Manager"][n % 3],
+            "hire_date": f"2020-01-0{n % 4 + 1}",
+            "salary": 5000 + 100 * (n % 2),
+        }
+        for n in range(7)
+    ]
+    response = await async_client.post("/api/v1/employees/bulk", json=rows)
+    ids = [result["employee_id"] for result in response.json()["results"]]
+
+    for sort in ("position", "-position", "hire_date", "-salary", "-employee_id"):
+        full = await walk_employees(async_client, sort=sort, limit=1000)
+        paged = await walk_employees(async_client, sort=sort, limit=2)
+        assert [e["employee_id"] for e in paged] == [e["employee_id"] for e in full]
+
+    filtered = await walk_employees(
+        async_client, salary_min=5050, salary_max=5100, hire_date_from="2020-01-01"
+    )
+    assert {e["employee_id"] for e in filtered} >= set(ids[1::2])
+    assert all(5050 <= e["salary"] <= 5100 for e in filtered)
+
+    for employee_id in ids:
+        await async_client.delete(f"/api/v1/employees/{employee_id}")
+
+
+@pytest.mark.asyncio
+# sparse fieldsets still page by a sort column that was not requested
+async def test_get_employees_fields(async_client: AsyncClient):
+    full = await walk_employees(async_client, sort="-salary", limit=1000)
+    paged = await walk_employees(
+        async_client, sort="-salary", limit=1, fields="last_name"
+    )
+    assert all(set(employee) == {"employee_id", "last_name"} for employee in paged)
+    assert [e["employee_id"] for e in paged] == [e["employee_id"] for e in full]
+
+
+@pytest.mark.asyncio
+# repeat list requests reuse the statements built for their shape
+async def test_employee_statements_cached(async_client: AsyncClient):
+    params = {"position": "Clerk", "order_by": "salary", "limit": 1}
+    await async_client.get("/api/v1/employees/", params=params)
+    shapes = dict(employee_query._statements)
+    await async_client.get("/api/v1/employees/", params={**params, "position": "x"})
+    assert employee_query._statements == shapes
@@ -0,0 +1,35 @@
+from httpx import AsyncClient
+import pytest
+
+
+def sample(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+@pytest.mark.asyncio
+# requests are counted per route template with their database work
+async def test_metrics(async_client: AsyncClient):
+    route = 'method="GET",route="/api/v1/employees/{employee_id}"'
+    before = (await async_client.get("/metrics")).text
+
+    response = await async_client.get("/api/v1/employees/", params={"limit": 1})
+    employee_id = response.json()["data"][0]["employee_id"]
+    await async_client.get(f"/api/v1/employees/{employee_id}")
+    await async_client.get("/api/v1/employees/0")
+
+    response = await async_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    after = response.text
+
+    for status in ("200", "404"):
+        name = f'http_requests_total{{{route},status="{status}"}}'
+        assert sample(after, name) == sample(before, name) + 1
+    name = f"http_request_db_queries_sum{{{route}}}"
+    assert sample(after, name) >= sample(before, name) + 2
+    assert f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}' in after
+    assert 'db_pool_checkout_wait_seconds_count{engine="reader"}' in after
+    assert 'cache_hit_ratio{cache="compiled_statements"}' in after
@@ -0,0 +1,158 @@
+import asyncio
+import uuid
+from httpx import AsyncClient
+import pytest
+
+
+async def create_product(async_client: AsyncClient, price: float, stock: int):
+    response = await async_client.post(
+        "/api/v1/products/",
+        json={
+            "product_name": f"Order test {uuid.uuid4().hex[:8]}",
+            "category_id": 1,
+            "price": price,
+            "stock_quantity": stock,
+        },
+    )
+    assert response.status_code == 201
+    return response.json()["data"]["product_id"]
+
+
+async def create_customer(async_client: AsyncClient):
+    response = await async_client.post(
+        "/api/v1/customers/",
+        json={
+            "first_name": "Order",
+            "last_name": "Tester",
+            "email": f"order.{uuid.uuid4().hex}@example.com",
+            "phone": "555-0004",
+            "address": "5 Test St.",
+            "city": "Testville",
+            "country": "USA",
+        },
+    )
+    assert response.status_code == 201
+    return response.json()["customer_id"]
+
+
+async def stock_of(async_client: AsyncClient, product_id: int):
+    response = await async_client.get(f"/api/v1/products/{product_id}")
+    return response.json()["data"]["stock_quantity"]
+
+
+@pytest.mark.asyncio
+# stock is taken, repeated lines merged and the total computed
+async def test_place_order(async_client: AsyncClient):
+    customer_id = await create_customer(async_client)
+    lamp = await create_product(async_client, 10.25, 5)
+    desk = await create_product(async_client, 99.5, 2)
+
+    response = await async_client.post(
+        "/api/v1/orders",
+        json={
+            "customer_id": customer_id,
+            "items": [
+                {"product_id": lamp, "quantity": 2},
+                {"product_id": desk, "quantity": 1},
+                {"product_id": lamp, "quantity": 1},
+            ],
+        },
+    )
+    assert response.status_code == 201
+    order = response.json()["data"]
+    assert order["total_amount"] == 130.25
+    assert order["status"] == "Pending"
+    assert {item["product_id"]: item["quantity"] for item in order["items"]} == {
+        lamp: 3,
+        desk: 1,
+    }
+    assert await stock_of(async_client, lamp) == 2
+    assert await stock_of(async_client, desk) == 1
+
+    response = await async_client.get(f"/api/v1/orders/{order['order_id']}")
+    assert response.status_code == 200
+    assert response.json()["data"]["total_amount"] == 130.25
+    assert len(response.json()["data"]["items"]) == 2
+
+
+@pytest.mark.asyncio
+# a failed line rolls back the stock already taken for the others
+async def test_place_order_rejected(async_client: AsyncClient):
+    customer_id = await create_customer(async_client)
+    lamp = await create_product(async_client, 10, 5)
+    desk = await create_product(async_client, 20, 1)
+
+    def order(items, customer=customer_id):
+        return {"customer_id": customer, "items": items}
+
+    response = await async_client.post(
+        "/api/v1/orders",
+        json=order(
+            [{"product_id": lamp, "quantity": 2}, {"product_id": desk, "quantity": 2}]
+        ),
+    )
+    assert response.status_code == 409
+    assert await stock_of(async_client, lamp) == 5
+    assert await stock_of(async_client, desk) == 1
+
+    response = await async_client.post(
+        "/api/v1/orders", json=order([{"product_id": 10**9, "quantity": 1}])
+    )
+    assert response.status_code == 404
+
+    response = await async_client.post(
+        "/api/v1/orders",
+        json=order([{"product_id": lamp, "quantity": 1}], customer=10**9),
+    )
+    assert response.status_code == 404
+    assert await stock_of(async_client, lamp) == 5
+
+    response = await async_client.post(
+        "/api/v1/orders", json=order([{"product_id": lamp, "quantity": 0}])
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+# concurrent orders for the last units never oversell
+async def test_concurrent_orders(async_client: AsyncClient):
+    customer_id = await create_customer(async_client)
+    product_id = await create_product(async_client, 5, 5)
+
+    responses = await asyncio.gather(
+        *(
+            async_client.post(
+                "/api/v1/orders",
+                json={
+                    "customer_id": customer_id,
+                    "items": [{"product_id": product_id, "quantity": 1}],
+                },
+            )
+            for _ in range(20)
+        )
+    )
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [201] * 5 + [409] * 15
+    assert await stock_of(async_client, product_id) == 0
+
+
+@pytest.mark.asyncio
+# BEGIN IMMEDIATE, customer check, one UPDATE per product, order and items
+async def test_place_order_budget(async_client: AsyncClient, request_budget):
+    customer_id = await create_customer(async_client)
+    lamp = await create_product(async_client, 1, 100)
+    desk = await create_product(async_client, 2, 100)
+    await request_budget.check(
+        "POST",
+        "/api/v1/orders",
+        statements=6,
+        median_ms=50,
+        json={
+            "customer_id": customer_id,
+            "items": [
+                {"product_id": lamp, "quantity": 1},
+                {"product_id": desk, "quantity": 1},
+            ],
+        },
+    )
+    assert await stock_of(async_client, lamp) == 94
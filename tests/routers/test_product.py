@@ -0,0 +1,55 @@
+from httpx import AsyncClient
+import pytest
+
+
+@pytest.mark.asyncio
+# create, read, filter, update and remove a product
+async def test_product_lifecycle(async_client: AsyncClient):
+    payload = {
+        "product_name": "Test lamp",
+        "category_id": 1,
+        "price": 19.99,
+        "stock_quantity": 7,
+    }
+    response = await async_client.post("/api/v1/products/", json=payload)
+    assert response.status_code == 201
+    product = response.json()["data"]
+    product_id = product["product_id"]
+    assert product["stock_quantity"] == 7
+
+    response = await async_client.get(f"/api/v1/products/{product_id}")
+    assert response.status_code == 200
+    assert response.json()["data"]["product_name"] == "Test lamp"
+
+    response = await async_client.get(
+        "/api/v1/products/",
+        params={"category_id": 1, "price_min": 19.99, "price_max": 19.99},
+    )
+    assert response.status_code == 200
+    assert product_id in [row["product_id"] for row in response.json()["data"]]
+
+    payload["price"] = 24.5
+    response = await async_client.put(f"/api/v1/products/{product_id}", json=payload)
+    assert response.status_code == 200
+    assert response.json()["data"]["price"] == 24.5
+
+    response = await async_client.delete(f"/api/v1/products/{product_id}")
+    assert response.status_code == 200
+
+    response = await async_client.get(f"/api/v1/products/{product_id}")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+# stock can never be set negative
+async def test_create_product_negative_stock(async_client: AsyncClient):
+    response = await async_client.post(
+        "/api/v1/products/",
+        json={
+            "product_name": "Broken",
+            "category_id": 1,
+            "price": 1,
+            "stock_quantity": -1,
+        },
+    )
+    assert response.status_code == 422
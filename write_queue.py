@@ -0,0 +1,111 @@
+import os
+import asyncio
+import logging
+from sqlalchemy import insert
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# Routers that send their inserts through the group-commit queue,
+# e.g. GROUP_COMMIT_ROUTERS=customers,employees
+group_commit_routers = set(
+    name.strip()
+    for name in os.getenv("GROUP_COMMIT_ROUTERS", "").split(",")
+    if name.strip()
+)
+
+
+def group_commit_enabled(router_name: str) -> bool:
+    return router_name in group_commit_routers
+
+
+# Collects inserts from concurrent requests and commits them together, so a
+# burst of POSTs pays for one fsync per batch instead of one per row. The
+# batch closes after max_delay_ms or max_batch rows, whichever comes first.
+# The writer connection is only checked out while a batch is being flushed,
+# so other writes on the single-connection writer pool keep going between
+# batches.
+class WriteCoordinator:
+    def __init__(self, engine, max_delay_ms: float = 5, max_batch: int = 500):
+        self.engine = engine
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max_batch
+        self._queue = None
+        self._task = None
+        self._loop = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None or self._loop is not asyncio.get_running_loop():
+            self._task = None
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # Fail anything still waiting rather than leaving requests hanging
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Write coordinator stopped"))
+
+    # Queue one row and wait for the batch it lands in to commit
+    async def insert(self, model, values: dict):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((model.__table__, values, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        try:
+            async with self.engine.begin() as conn:
+                keys = []
+                for table, values, _ in batch:
+                    result = await conn.execute(insert(table).values(**values))
+                    keys.append(result.inserted_primary_key[0])
+        except Exception as e:
+            # One bad row fails the whole transaction; retry rows one by one
+            # so only the offending requests see the error
+            logger.warning(f"Group commit of {len(batch)} rows failed: {e}")
+            if len(batch) > 1:
+                for item in batch:
+                    await self._flush([item])
+            else:
+                _, _, future = batch[0]
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), key in zip(batch, keys):
+            if not future.done():
+                future.set_result(key)
+
+
+write_coordinator = WriteCoordinator(
+    engine,
+    max_delay_ms=float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", "5")),
+    max_batch=int(os.getenv("GROUP_COMMIT_MAX_BATCH", "500")),
+)